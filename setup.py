@@ -0,0 +1,34 @@
+"""
+Build script for hgfind. Package metadata lives in setup.cfg; this only hooks
+the build so that wheels ship with prebuilt caches (see hgfind.prebuilt).
+
+"""
+import sys
+from pathlib import Path
+
+from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildPyWithPrebuiltCaches(build_py):
+    """
+    Builds the package as usual, then writes the prebuilt caches next to the
+    BioMart file in the build directory
+
+    """
+
+    def run(self):
+        super().run()
+        if self.dry_run:
+            return
+
+        sys.path.insert(0, str(Path(__file__).parent / "src"))
+        from hgfind.prebuilt import write_prebuilt
+
+        package_dir = Path(self.build_lib) / "hgfind"
+        write_prebuilt(
+            package_dir, package_dir / "biomart-gene-coordinates.txt"
+        )
+
+
+setup(cmdclass={"build_py": BuildPyWithPrebuiltCaches})
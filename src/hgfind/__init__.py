@@ -2,4 +2,23 @@
 Import hgfind for ease of importing from package
 
 """
-from .hgfind import WrongGeneName, hgfind
+from .annotate import annotate_bed, annotate_vcf
+from .binindex import MappedIndex, load_mapped_index
+from .columnar import GeneArrays, hgfind_arrays
+from .density import GeneDensity, gene_density
+from .hgfind import (
+    GENE_INDEX,
+    GeneIndex,
+    WrongGeneName,
+    hgfind,
+    hgfind_many,
+    lookup,
+    normalize_name,
+)
+from .loci import hgfind_loci
+from .nearest import NearestArrays, hgfind_nearest, nearest_arrays
+from .proximity import GenePair, proximity_join
+from .regions import genes_on, hgfind_region, iter_genes, parse_region
+from .search import hgfind_complete, hgfind_search
+from .sqlindex import SqliteIndex, load_sqlite_index
+from .windows import GeneWindows, gene_windows, windows_bed
@@ -0,0 +1,7 @@
+"""
+Allows running hgfind as python -m hgfind
+
+"""
+from .cli import main
+
+main()
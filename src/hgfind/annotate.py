@@ -0,0 +1,250 @@
+"""
+Annotation of genomic interval (BED) and variant (VCF) files with the genes
+they overlap.
+
+Rather than querying the interval index once per record, the records are
+sorted (or taken as sorted) and swept through together with the genome
+ordered genes in a single linear merge join, which is what makes annotating
+whole-genome files fast.
+
+"""
+
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from .hgfind import GENE_INDEX, Chromosome
+from .regions import overlapping_rows
+from .table import GeneTable
+
+BED_HEADERS = ("#", "track", "browser")
+
+
+def open_text(path: str) -> IO[str]:
+    """
+    Opens a text file for reading, decompressing it if it is gzipped
+
+    """
+    if path.endswith(".gz"):
+        # Imported here, so that plain files do not pay for importing zlib
+        import gzip
+
+        return gzip.open(path, "rt")
+    return open(path)
+
+
+def chromosome_code(name: str) -> Optional[int]:
+    """
+    Converts a sequence name as used in BED and VCF files, such as "chr1",
+    "1", "chrM" or "MT", to a chromosome code, returning None for sequences
+    other than the human chromosomes (e.g. unplaced contigs)
+
+    """
+    if name[:3].lower() == "chr":
+        name = name[3:]
+    try:
+        return int(Chromosome(name))
+    except ValueError:
+        return None
+
+
+class GeneSweep:
+    """
+    Finds the genes overlapping a stream of regions in one linear pass over
+    the genome ordered genes. Within each run of regions on the same
+    chromosome, regions must come sorted by start coordinate.
+
+    """
+
+    def __init__(self, table: GeneTable):
+        self.table = table
+        self.chr_code = None
+        self.last_start = 0
+        self.next_row = self.stop = 0
+        # Genes that started before the last region ended and have not yet
+        # been passed by the sweep, in genome order
+        self.active: List[int] = []
+
+    def overlapping(self, chr_code: int, start: int, end: int) -> List[int]:
+        """
+        Finds the genes overlapping the next region.
+
+        :param chr_code: the chromosome code of the region
+        :param start: start of the region (1-based, inclusive)
+        :param end: end of the region (1-based, inclusive)
+        :returns: the GeneTable rows overlapping the region, in genome order
+        :raises ValueError: if the region starts before the previous region
+            on the same chromosome
+
+        """
+        table = self.table
+
+        if chr_code != self.chr_code:
+            self.chr_code = chr_code
+            self.next_row, self.stop = table.chrom_rows.get(chr_code, (0, 0))
+            self.active = []
+        elif start < self.last_start:
+            raise ValueError(
+                f"regions are not sorted: {start} follows {self.last_start}"
+            )
+        self.last_start = start
+
+        # Genes ending before this region cannot overlap any later one either
+        active = self.active
+        if active and min(table.end[row] for row in active) < start:
+            active = self.active = [
+                row for row in active if table.end[row] >= start
+            ]
+
+        while self.next_row < self.stop and table.start[self.next_row] <= end:
+            active.append(self.next_row)
+            self.next_row += 1
+
+        # A long earlier region may have admitted genes starting after this
+        # one ends; those are at the end of the list
+        found = []
+        for row in active:
+            if table.start[row] > end:
+                break
+            if table.end[row] >= start:
+                found.append(row)
+        return found
+
+
+def _bed_record(line: str, line_n: int) -> Tuple[Optional[int], int, int]:
+    """
+    Parses the location of a BED record into a chromosome code and 1-based,
+    inclusive start and end coordinates
+
+    """
+    fields = line.split("\t", 3)
+    try:
+        start, end = int(fields[1]) + 1, int(fields[2])
+    except (IndexError, ValueError):
+        raise ValueError(
+            f"line {line_n}: expected a BED record, got {line!r}"
+        ) from None
+    # Zero-length records (insertion points) are treated as the base after
+    return chromosome_code(fields[0]), start, max(start, end)
+
+
+def annotate_bed(
+    lines: Iterable[str], presorted: bool = False
+) -> Iterator[Tuple[str, Optional[List[str]]]]:
+    """
+    Annotates BED records with the official names of the genes they overlap.
+
+    Unless presorted is set, all records are read and sorted into genome
+    order first. With presorted, records are annotated as they are read, in
+    constant memory, but must be sorted by start within each chromosome (as
+    e.g. "sort -k1,1 -k2,2n" does).
+
+    :param lines: the lines of a BED file
+    :param presorted: whether the records are already sorted
+    :returns: an iterator of (line, gene names) pairs, where the line has no
+        trailing newline and header and blank lines are paired with None.
+        Unless presorted, header lines come first and records follow in
+        genome order, with records on sequences other than the human
+        chromosomes last.
+    :raises ValueError: if a line is not a BED record, or if presorted
+        records are out of order
+
+    """
+    table = GENE_INDEX.table
+    names = table.names
+    sweep = GeneSweep(table)
+
+    def annotated(records):
+        for chr_code, start, end, line in records:
+            if chr_code is None:
+                yield line, []
+            else:
+                rows = sweep.overlapping(chr_code, start, end)
+                yield line, [names[row] for row in rows]
+
+    records = []
+    others = []
+    for line_n, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.startswith(BED_HEADERS):
+            yield line, None
+            continue
+
+        chr_code, start, end = _bed_record(line, line_n)
+        if presorted:
+            yield from annotated([(chr_code, start, end, line)])
+        elif chr_code is None:
+            others.append((None, start, end, line))
+        else:
+            records.append((chr_code, start, end, line))
+
+    records.sort(key=lambda record: record[:2])
+    yield from annotated(records)
+    yield from annotated(others)
+
+
+def _info_header(field: str) -> str:
+    return (
+        f"##INFO=<ID={field},Number=.,Type=String,"
+        'Description="Official names of the hg38 genes overlapping the '
+        'variant (hgfind)">'
+    )
+
+
+def annotate_vcf(lines: Iterable[str], field: str = "GENES") -> Iterator[str]:
+    """
+    Annotates the records of a VCF file with the official names of the genes
+    they overlap, added as an INFO field. The field is declared in the header
+    and left out of records that overlap no gene.
+
+    Records are annotated as they are read, in constant memory. The genes are
+    swept through in genome order alongside the records, which VCF files
+    keep sorted by position; records out of order are looked up in the
+    interval index instead.
+
+    :param lines: the lines of a VCF file
+    :param field: the ID of the INFO field to add
+    :returns: an iterator of the annotated lines, without trailing newlines
+    :raises ValueError: if a line is not a VCF record
+
+    """
+    table = GENE_INDEX.table
+    names = table.names
+    sweep = GeneSweep(table)
+    chr_codes = {}
+    prefix = field + "="
+
+    for line_n, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if line.startswith("#"):
+            if line.startswith("#CHROM"):
+                yield _info_header(field)
+            yield line
+            continue
+
+        fields = line.split("\t", 8)
+        try:
+            chr_name, ref, info = fields[0], fields[3], fields[7]
+            start = int(fields[1])
+        except (IndexError, ValueError):
+            raise ValueError(
+                f"line {line_n}: expected a VCF record, got {line!r}"
+            ) from None
+
+        if chr_name not in chr_codes:
+            chr_codes[chr_name] = chromosome_code(chr_name)
+        chr_code = chr_codes[chr_name]
+        if chr_code is None:
+            yield line
+            continue
+
+        end = start + max(len(ref), 1) - 1
+        if chr_code == sweep.chr_code and start < sweep.last_start:
+            rows = overlapping_rows(chr_code, start, end)
+        else:
+            rows = sweep.overlapping(chr_code, start, end)
+        if not rows:
+            yield line
+            continue
+
+        genes = prefix + ",".join(names[row] for row in rows)
+        fields[7] = genes if info in ("", ".") else f"{info};{genes}"
+        yield "\t".join(fields)
@@ -0,0 +1,322 @@
+"""
+Compact binary, memory-mapped alternative to the pickle cache.
+
+The index file is laid out as a fixed header followed by four sections:
+
+  - gene records: one fixed-width record per official gene holding its start
+    and end coordinate, the location of its official name in the string blob,
+    its chromosome code and its strand code
+  - name records: one fixed-width record per key that gene names resolve
+    through (see hgfind.resolution_keys), sorted by the UTF-8 encoding of the
+    key, pointing into the string blob and at the gene record the key
+    resolves to
+  - name filter: the bits of a Bloom filter of the keys (empty if the index
+    was written without one)
+  - string blob: the UTF-8 encoded official names and keys, back to back
+
+Lookups binary search the name records directly in the mapped file for the
+keys of the queried name, so opening an index costs no deserialization,
+processes mapping the same file share its physical pages, and names resolve
+exactly as hgfind() resolves them. Most unknown names are rejected by the name
+filter, without touching the name records at all.
+
+"""
+
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from .bloom import BloomFilter
+from .cache import atomic_output, build_lock, cache_candidates, scratch_path
+from .hgfind import (
+    CHROMOSOMES,
+    PATH_TO_BIO_MART,
+    file_to_dicts,
+    query_keys,
+    resolution_keys,
+)
+from .table import CODE_TO_STRAND, STRAND_TO_CODE
+
+MAGIC = b"HGFIDX"
+FORMAT_VERSION = 3
+
+# magic, format version, number of gene records, number of name records,
+# name filter size in bytes, number of name filter hashes
+_HEADER = struct.Struct("<6sHIIIB")
+# start, end, official name offset, official name length, chromosome, strand
+_GENE = struct.Struct("<IIIHBb")
+# name offset, name length, gene record index
+_NAME = struct.Struct("<IHI")
+
+
+def write_index(
+    path: Union[str, Path],
+    name_to_official: Dict,
+    official_to_coord: Dict,
+    filter_bits_per_key: int = 10,
+):
+    """
+    Writes the two dictionaries produced by file_to_dicts as a binary index.
+    The file is written atomically, so that readers never see a partially
+    written index.
+
+    :param path: where to write the index
+    :param name_to_official: gene name -> official name dictionary
+    :param official_to_coord: official name -> genome location dictionary
+    :param filter_bits_per_key: the size of the name filter per name (see
+        BloomFilter.from_keys); 0 leaves the filter out
+
+    """
+
+    blob = bytearray()
+    offsets = {}
+
+    def intern(name):
+        if name not in offsets:
+            encoded = name.encode()
+            offsets[name] = (len(blob), len(encoded))
+            blob.extend(encoded)
+        return offsets[name]
+
+    officials = sorted(official_to_coord)
+    official_to_record = {}
+    genes = bytearray()
+    for record, official_name in enumerate(officials):
+        chr_n, start_coord, end_coord, strand = official_to_coord[
+            official_name
+        ]
+        official_to_record[official_name] = record
+        genes.extend(
+            _GENE.pack(
+                start_coord,
+                end_coord,
+                *intern(official_name),
+                int(chr_n),
+                STRAND_TO_CODE[strand],
+            )
+        )
+
+    names = sorted(
+        (
+            (key.encode(), key, official_to_record[official_name])
+            for key, official_name in resolution_keys(
+                name_to_official, official_to_coord
+            ).items()
+        ),
+    )
+    name_records = bytearray()
+    for _, name, record in names:
+        name_records.extend(_NAME.pack(*intern(name), record))
+
+    if filter_bits_per_key > 0:
+        name_filter = BloomFilter.from_keys(
+            (name for _, name, _ in names), filter_bits_per_key
+        )
+    else:
+        name_filter = BloomFilter(bytearray(), 0)
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        len(officials),
+        len(names),
+        len(name_filter.bits),
+        name_filter.n_hashes,
+    )
+
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "wb") as handle:
+            handle.write(header)
+            handle.write(genes)
+            handle.write(name_records)
+            handle.write(name_filter.bits)
+            handle.write(blob)
+
+
+class MappedIndex:
+    """
+    A read-only gene index queried in place from a memory-mapped binary index
+    file written by write_index.
+
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        with open(path, "rb") as handle:
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (
+                magic,
+                version,
+                n_genes,
+                n_names,
+                filter_size,
+                filter_hashes,
+            ) = _HEADER.unpack_from(self._mm)
+        except struct.error:
+            magic, version = None, None
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} index")
+
+        self.n_genes = n_genes
+        self.n_names = n_names
+        self._genes_at = _HEADER.size
+        self._names_at = self._genes_at + n_genes * _GENE.size
+        self._filter_at = self._names_at + n_names * _NAME.size
+        self._blob_at = self._filter_at + filter_size
+        if len(self._mm) < self._blob_at:
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+
+        # The filter is copied out of the map, as it is probed bit by bit
+        self._filter = None
+        if filter_size:
+            self._filter = BloomFilter(
+                self._mm[self._filter_at : self._blob_at], filter_hashes
+            )
+
+    def __len__(self):
+        return self.n_names
+
+    def __contains__(self, name):
+        return self._resolve(name) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Unmaps the index file
+
+        """
+        self._mm.close()
+
+    def _string(self, offset, length):
+        start = self._blob_at + offset
+        return self._mm[start : start + length]
+
+    def _find(self, key: str) -> Optional[int]:
+        """
+        Binary searches the sorted name records for the given key.
+
+        :returns: the index of the gene record the key resolves to, or None
+
+        """
+        if self._filter is not None and key not in self._filter:
+            return None
+
+        encoded = key.encode()
+        lo, hi = 0, self.n_names
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, length, record = _NAME.unpack_from(
+                self._mm, self._names_at + mid * _NAME.size
+            )
+            probe = self._string(offset, length)
+            if probe < encoded:
+                lo = mid + 1
+            elif probe > encoded:
+                hi = mid
+            else:
+                return record
+        return None
+
+    def _resolve(self, gene: str) -> Optional[int]:
+        """
+        Looks the keys of a gene name up in turn (see hgfind.query_keys).
+
+        :returns: the index of the gene record the name resolves to, or None
+
+        """
+        for key in query_keys(gene):
+            record = self._find(key)
+            if record is not None:
+                return record
+        return None
+
+    def lookup(self, gene: str) -> Optional[Dict]:
+        """
+        Looks up a gene name as hgfind() does, ignoring case and falling back
+        on the canonical keys of the names (see hgfind.normalize_name).
+
+        :param gene: the name of a gene
+        :returns: the same dictionary as hgfind() on success, None otherwise
+
+        """
+        record = self._resolve(gene)
+        if record is None:
+            return None
+
+        (
+            start_coord,
+            end_coord,
+            offset,
+            length,
+            chr_code,
+            strand,
+        ) = _GENE.unpack_from(self._mm, self._genes_at + record * _GENE.size)
+        return {
+            "chr_n": CHROMOSOMES[chr_code],
+            "start_coord": start_coord,
+            "end_coord": end_coord,
+            "strand": CODE_TO_STRAND[strand],
+            "official_name": self._string(offset, length).decode(),
+        }
+
+
+def load_mapped_index(
+    path: Optional[Union[str, Path]] = None,
+    bio_mart_path: Union[str, Path] = PATH_TO_BIO_MART,
+) -> MappedIndex:
+    """
+    Opens the binary index at the given path, building it from the BioMart
+    file first if it does not exist yet or cannot be read.
+
+    :param path: path of the binary index file; defaults to a content
+        addressed file in the hgfind cache directory, falling back on the
+        index prebuilt into the package, or if the cache directory cannot be
+        written, on a temporary file removed when the process exits
+    :param bio_mart_path: BioMart file to build the index from if needed
+    :returns: the opened MappedIndex
+
+    """
+
+    if path is None:
+        candidates = cache_candidates(
+            bio_mart_path, "binary", FORMAT_VERSION, ".idx"
+        )
+    else:
+        candidates = [path]
+
+    for candidate in candidates:
+        try:
+            return MappedIndex(candidate)
+        except (OSError, ValueError):
+            pass
+
+    with build_lock(candidates[0]):
+        # Another process may have built the index while we were waiting
+        try:
+            return MappedIndex(candidates[0])
+        except (OSError, ValueError):
+            pass
+        dicts = file_to_dicts(bio_mart_path)
+        try:
+            write_index(candidates[0], *dicts)
+            return MappedIndex(candidates[0])
+        except OSError:
+            if path is not None:
+                raise
+            print(
+                f"Could not cache in {candidates[0].parent}...",
+                file=sys.stderr,
+            )
+        path = scratch_path(candidates[0].name)
+        write_index(path, *dicts)
+    return MappedIndex(path)
@@ -0,0 +1,79 @@
+"""
+A compact Bloom filter over strings, stored alongside the on-disk gene indexes
+to reject unknown gene names without searching the index itself.
+
+Keys are hashed with BLAKE2b rather than the built-in hash(), which differs
+between processes, so that a filter can be written to disk and read back.
+
+"""
+
+from hashlib import blake2b
+from math import ceil, log
+from typing import Iterable, Tuple, Union
+
+
+class BloomFilter:
+    """
+    A set of strings that may report false positives, but never false
+    negatives: a key added is always found, while a key not added is found
+    with a small probability (under 1% at the default of ten bits per key).
+    A filter whose bits are given as bytes is read-only.
+
+    """
+
+    def __init__(self, bits: Union[bytearray, bytes], n_hashes: int):
+        self.bits = bits
+        self.n_bits = 8 * len(bits)
+        self.n_hashes = n_hashes
+
+    @classmethod
+    def from_keys(
+        cls, keys: Iterable[str], bits_per_key: int = 10
+    ) -> "BloomFilter":
+        """
+        Builds a filter containing the given keys.
+
+        :param keys: the keys to add
+        :param bits_per_key: the size of the filter per key, trading memory
+            for fewer false positives
+        :returns: the filter
+
+        """
+        keys = set(keys)
+        n_bytes = max(1, ceil(len(keys) * bits_per_key / 8))
+        # The number of hashes minimizing false positives
+        n_hashes = max(1, round(bits_per_key * log(2)))
+        bloom_filter = cls(bytearray(n_bytes), n_hashes)
+        for key in keys:
+            bloom_filter.add(key)
+        return bloom_filter
+
+    def _hashes(self, key: str) -> Tuple[int, int]:
+        # Two independent 32-bit hashes, for double hashing: the positions of
+        # a key are h1 + i * h2 for i < n_hashes
+        digest = int.from_bytes(
+            blake2b(key.encode("utf-8"), digest_size=8).digest(), "little"
+        )
+        return digest & 0xFFFFFFFF, digest >> 32 | 1
+
+    def add(self, key: str):
+        """
+        Adds a key to the filter
+
+        """
+        bits, n_bits = self.bits, self.n_bits
+        position, step = self._hashes(key)
+        for _ in range(self.n_hashes):
+            position %= n_bits
+            bits[position >> 3] |= 1 << (position & 7)
+            position += step
+
+    def __contains__(self, key: str) -> bool:
+        bits, n_bits = self.bits, self.n_bits
+        position, step = self._hashes(key)
+        for _ in range(self.n_hashes):
+            position %= n_bits
+            if not bits[position >> 3] & 1 << (position & 7):
+                return False
+            position += step
+        return True
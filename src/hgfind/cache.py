@@ -0,0 +1,364 @@
+"""
+Helpers for locating and atomically writing hgfind's on-disk caches.
+
+Cache files live in a per-user cache directory and are content addressed: the
+name of every cache file contains a hash of the source file it was built from,
+the hgfind version, the parsing code and the cache format version. A cache
+built from different inputs is therefore never picked up, and caches are only
+ever written through a temporary file that is renamed into place once
+complete.
+
+Wheels additionally ship prebuilt caches inside the package directory (see
+hgfind.prebuilt), under the same content addressed names.
+
+Building a missing cache happens under an inter-process file lock (see
+build_lock), so that when many processes start at once only one of them pays
+for parsing the source file while the others wait and then load its result.
+load_pickle does all of this for caches that are pickled Python objects.
+
+"""
+
+import atexit
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+# Environment variable overriding the cache directory
+CACHE_DIR_ENV = "HGFIND_CACHE_DIR"
+
+# The module holding the parsing logic that every cache is derived from
+PATH_TO_PARSER = Path(__file__).parent / "hgfind.py"
+
+# Read-only directory holding the caches prebuilt when building a wheel
+PREBUILT_DIR = Path(__file__).parent
+
+# Present when running from a source tree rather than an installed package
+PATH_TO_VERSION = Path(__file__).parents[2] / "VERSION"
+
+# Highest protocol readable by every supported Python version, so that the
+# pickles prebuilt into wheels load everywhere
+PICKLE_PROTOCOL = 4
+
+_digests: Dict[Tuple[str, int, int], str] = {}
+# Temporary directory of the caches that could not be written to cache_dir()
+_scratch_dir: Optional[str] = None
+
+
+def hgfind_version() -> str:
+    """
+    Returns the version of hgfind: the one in the VERSION file when running
+    from a source tree, the installed one otherwise, or "unknown" if neither
+    is available
+
+    """
+    if PATH_TO_VERSION.is_file():
+        return PATH_TO_VERSION.read_text().strip()
+    # Imported here, as it takes a while to import and source trees do
+    # without it
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+    except ImportError:  # Python < 3.8
+        return "unknown"
+    try:
+        return version("hgfind")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def cache_dir() -> Path:
+    """
+    Returns the directory hgfind caches are written to: $HGFIND_CACHE_DIR if
+    set, otherwise the platform's per-user cache directory.
+
+    """
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        return Path(os.environ["LOCALAPPDATA"]) / "hgfind" / "Cache"
+    if sys.platform == "darwin":
+        return Path.home() / "Library" / "Caches" / "hgfind"
+    if os.environ.get("XDG_CACHE_HOME"):
+        return Path(os.environ["XDG_CACHE_HOME"]) / "hgfind"
+    return Path.home() / ".cache" / "hgfind"
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """
+    Returns the SHA-256 hex digest of a file's contents. Digests are
+    remembered for as long as the file's size and modification time do not
+    change.
+
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _digests:
+        sha = hashlib.sha256()
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                sha.update(block)
+        _digests[key] = sha.hexdigest()
+    return _digests[key]
+
+
+def cache_key(source: Union[str, Path], kind: str, format_version) -> str:
+    """
+    Computes the content address of a cache built from the given source file.
+
+    :param source: the file (e.g. BioMart table) the cache is built from
+    :param kind: what is cached, e.g. "pickle" or "sqlite"
+    :param format_version: the version of the cache's on-disk format
+    :returns: a short hex digest identifying the cache contents
+
+    """
+    sha = hashlib.sha256()
+    for part in (
+        file_digest(source),
+        file_digest(PATH_TO_PARSER),
+        hgfind_version(),
+        kind,
+        str(format_version),
+    ):
+        sha.update(part.encode())
+        sha.update(b"\0")
+    return sha.hexdigest()[:20]
+
+
+def cache_name(
+    source: Union[str, Path], kind: str, format_version, suffix: str
+) -> str:
+    """
+    Returns the content addressed file name of a cache built from a source
+    file.
+
+    :param source: the file (e.g. BioMart table) the cache is built from
+    :param kind: what is cached, e.g. "pickle" or "sqlite"
+    :param format_version: the version of the cache's on-disk format
+    :param suffix: file extension of the cache, e.g. ".pickle"
+    :returns: the file name of the cache
+
+    """
+    key = cache_key(source, kind, format_version)
+    return f"{Path(source).stem}-{kind}-{key}{suffix}"
+
+
+def cache_path(
+    source: Union[str, Path], kind: str, format_version, suffix: str
+) -> Path:
+    """
+    Returns the path a cache built from a source file is written to, inside
+    cache_dir(). Arguments are as for cache_name.
+
+    """
+    return cache_dir() / cache_name(source, kind, format_version, suffix)
+
+
+def cache_candidates(
+    source: Union[str, Path], kind: str, format_version, suffix: str
+) -> List[Path]:
+    """
+    Returns the paths a cache built from a source file may be read from, in
+    order of preference: the writable cache directory, then the caches
+    prebuilt into the package. Arguments are as for cache_name.
+
+    """
+    name = cache_name(source, kind, format_version, suffix)
+    return [cache_dir() / name, PREBUILT_DIR / name]
+
+
+def scratch_path(name: str) -> Path:
+    """
+    Returns a path in a temporary directory private to this process, which
+    is removed when the process exits. Caches that must be opened from a
+    file but cannot be written to cache_dir() (e.g. as it is read-only) are
+    built there instead.
+
+    :param name: the file name of the cache
+    :returns: the path to build the cache at
+
+    """
+    global _scratch_dir
+    if _scratch_dir is None:
+        _scratch_dir = tempfile.mkdtemp(prefix="hgfind-")
+        atexit.register(shutil.rmtree, _scratch_dir, True)
+    return Path(_scratch_dir) / name
+
+
+@contextmanager
+def atomic_output(path: Union[str, Path]) -> Iterator[str]:
+    """
+    Context manager yielding a temporary path in the same directory as the
+    given path. Once the block completes the temporary file is renamed to the
+    given path, so readers only ever see complete files; if the block raises,
+    the temporary file is removed instead.
+
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=str(path.parent), prefix=f".{path.name}.", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        yield tmp_path
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, str(path))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _acquire(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        while True:
+            try:
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after about ten seconds; keep waiting
+                continue
+
+
+def _release(handle):
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def build_lock(path: Union[str, Path]) -> Iterator[None]:
+    """
+    Context manager holding an exclusive inter-process lock for building the
+    cache at the given path, blocking until the lock is available. The lock
+    is a sibling file with a ".lock" suffix. If that file cannot be created
+    (e.g. the cache directory is read-only) the block runs unlocked.
+
+    Callers should check again for the cache once the lock is held, since
+    another process may have built it in the meantime.
+
+    """
+    lock_path = Path(f"{path}.lock")
+    try:
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        handle = open(lock_path, "a+b")
+    except OSError:
+        handle = None
+
+    if handle is None:
+        yield
+        return
+
+    with handle:
+        _acquire(handle)
+        try:
+            yield
+        finally:
+            _release(handle)
+
+
+def dump_pickle(path: Union[str, Path], contents: Any):
+    """
+    Atomically writes an object to a pickle file that read_pickle can read
+    back
+
+    """
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "wb") as handle:
+            pickle.dump(contents, handle, protocol=PICKLE_PROTOCOL)
+
+
+def read_pickle(path: Union[str, Path]) -> Optional[Any]:
+    """
+    Reads the object in a pickle cache, returning None if the cache is
+    missing or unreadable (e.g. truncated, or written by code that no longer
+    exists)
+
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, "rb") as handle:
+        try:
+            return pickle.load(handle)
+        except (
+            ImportError,
+            AttributeError,
+            TypeError,
+            ValueError,
+            EOFError,
+            pickle.UnpicklingError,
+        ):
+            return None
+
+
+def load_pickle(
+    source: Union[str, Path],
+    kind: str,
+    format_version,
+    build: Callable[[], Any],
+    is_valid: Optional[Callable[[Any], bool]] = None,
+) -> Any:
+    """
+    Loads an object from a pickle cache built from a source file, trying the
+    user's cache directory and then the caches prebuilt into the package. If
+    neither holds a usable cache, the object is built and cached under the
+    build lock, so that concurrently starting processes build it only once
+    between them.
+
+    :param source: the file (e.g. BioMart table) the cache is built from
+    :param kind: what is cached, e.g. "pickle" or "loci"
+    :param format_version: the version of the cache's on-disk format
+    :param build: builds the object when no cache is usable
+    :param is_valid: checks whether a cached object can be used; by default
+        any readable cache can
+    :returns: the cached or newly built object
+
+    """
+
+    def read(path: Path) -> Optional[Any]:
+        contents = read_pickle(path)
+        if contents is None or (
+            is_valid is not None and not is_valid(contents)
+        ):
+            return None
+        return contents
+
+    candidates = cache_candidates(source, kind, format_version, ".pickle")
+    for path in candidates:
+        contents = read(path)
+        if contents is not None:
+            return contents
+
+    path = candidates[0]
+    with build_lock(path):
+        # Another process may have built the cache while we were waiting
+        contents = read(path)
+        if contents is not None:
+            return contents
+
+        contents = build()
+        try:
+            dump_pickle(path, contents)
+        except OSError:
+            print(f"Could not cache in {path.parent}...", file=sys.stderr)
+
+    return contents
@@ -0,0 +1,365 @@
+"""
+Command line interface of hgfind
+
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO
+
+from .annotate import annotate_bed, annotate_vcf, open_text
+from .hgfind import BACKEND_ENV, BACKENDS, backend_lookup
+from .regions import hgfind_region
+
+# A formatter turns a query and its result (None if the query was not
+# recognized) into an output line, or None if nothing should be printed
+Formatter = Callable[[str, Optional[Dict]], Optional[str]]
+
+
+def format_text(query: str, result: Optional[Dict]) -> Optional[str]:
+    """
+    Formats a result for humans, e.g. "HNRNPD => 4:82352498-82374503 (-)"
+
+    """
+    if result is None:
+        return f"{query} not recognized as a gene"
+    return (
+        f"{result['official_name']} => {result['chr_n']}:"
+        f"{result['start_coord']}-{result['end_coord']} ({result['strand']})"
+    )
+
+
+def format_tsv(query: str, result: Optional[Dict]) -> Optional[str]:
+    """
+    Formats a result as tab separated query, official name, chromosome,
+    start, end and strand; all but the query are empty if not recognized
+
+    """
+    if result is None:
+        return query + "\t" * 5
+    return "\t".join(
+        [
+            query,
+            result["official_name"],
+            str(result["chr_n"]),
+            str(result["start_coord"]),
+            str(result["end_coord"]),
+            result["strand"],
+        ]
+    )
+
+
+def format_jsonl(query: str, result: Optional[Dict]) -> Optional[str]:
+    """
+    Formats a result as a JSON object on a single line
+
+    """
+    if result is None:
+        return json.dumps({"query": query, "found": False})
+    return json.dumps(
+        {
+            "query": query,
+            "found": True,
+            "official_name": result["official_name"],
+            "chr": str(result["chr_n"]),
+            "start": result["start_coord"],
+            "end": result["end_coord"],
+            "strand": result["strand"],
+        }
+    )
+
+
+def format_bed(query: str, result: Optional[Dict]) -> Optional[str]:
+    """
+    Formats a result as a BED6 line with a zero-based, half-open interval.
+    Unrecognized queries cannot be represented and are reported on stderr.
+
+    """
+    if result is None:
+        print(f"{query} not recognized as a gene", file=sys.stderr)
+        return None
+    strand = result["strand"] if result["strand"] in ("+", "-") else "."
+    return "\t".join(
+        [
+            f"chr{result['chr_n']}",
+            str(result["start_coord"] - 1),
+            str(result["end_coord"]),
+            result["official_name"],
+            "0",
+            strand,
+        ]
+    )
+
+
+FORMATTERS: Dict[str, Formatter] = {
+    "text": format_text,
+    "tsv": format_tsv,
+    "jsonl": format_jsonl,
+    "bed": format_bed,
+}
+
+
+def _iter_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_queries(
+    genes: Iterable[str], input_paths: Iterable[str], stdin: TextIO
+) -> Iterator[str]:
+    """
+    Yields the gene names to look up: the given genes, reading names lazily
+    from stdin in place of "-", followed by the names in the given input
+    files. Blank lines are skipped.
+
+    """
+    for gene in genes:
+        if gene == "-":
+            yield from _iter_lines(stdin)
+        else:
+            yield gene
+
+    for path in input_paths:
+        with open(path) as handle:
+            yield from _iter_lines(handle)
+
+
+def _query_parser(prog: str, description: str, what: str):
+    """
+    Creates a parser for commands that take queries as positional arguments,
+    from stdin or from input files, and print results in a choice of formats
+
+    """
+    parser = argparse.ArgumentParser(prog=prog, description=description)
+    parser.add_argument(
+        "queries",
+        nargs="*",
+        metavar=what,
+        help=f"A {what}, or - to read them from stdin (one per line)",
+    )
+    parser.add_argument(
+        "-i",
+        "--input",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help=f"Read {what}s from FILE (one per line); may be repeated",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=sorted(FORMATTERS),
+        default="text",
+        help="Output format (default: text)",
+    )
+    return parser
+
+
+def region_main(argv):
+    """
+    Parses command line region arguments and prints every gene overlapping
+    each region on stdout, streaming like the gene lookup does. Exits with
+    status 1 if any region could not be parsed.
+
+    """
+    parser = _query_parser(
+        "hgfind region",
+        "Get the human genes overlapping hg38 regions, given as e.g. "
+        "4:82352498-82374503",
+        "region",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.queries and not args.input:
+        parser.error("no regions given")
+
+    formatter = FORMATTERS[args.format]
+
+    # Output to a pipe is block buffered, so results for queries read from
+    # stdin are flushed as they are printed, for whoever is waiting on them
+    flush = "-" in args.queries
+    all_parsed = True
+    for query in iter_queries(args.queries, args.input, sys.stdin):
+        try:
+            results = hgfind_region(query)
+        except ValueError:
+            print(f"{query} not recognized as a region", file=sys.stderr)
+            all_parsed = False
+            continue
+
+        for result in results:
+            line = formatter(query, result)
+            if line is not None:
+                print(line, flush=flush)
+
+    if not all_parsed:
+        sys.exit(1)
+
+
+def genes_main(argv):
+    """
+    Parses command line gene arguments and prints one result per gene on
+    stdout. Genes are looked up and printed as they are read, so arbitrarily
+    long gene lists stream through in constant memory. Exits with status 1 if
+    any gene was not recognized.
+
+    """
+    parser = _query_parser(
+        "hgfind",
+        "Get the human genome (hg38) coordinates of genes",
+        "gene",
+    )
+    parser.add_argument(
+        "-b",
+        "--backend",
+        choices=BACKENDS,
+        help=f"Index to look genes up in (default: ${BACKEND_ENV} if set, "
+        "mmap for a single gene and memory otherwise)",
+    )
+    parser.epilog = (
+        "To find the genes in a region instead, run: hgfind region REGION"
+    )
+    args = parser.parse_args(argv)
+
+    if not args.queries and not args.input:
+        parser.error("no genes given")
+
+    formatter = FORMATTERS[args.format]
+
+    backend = args.backend or os.environ.get(BACKEND_ENV)
+    if backend is None:
+        # A single name is answered from the memory-mapped index, which opens
+        # in a fraction of the time it takes to load the resident dictionaries
+        single = len(args.queries) == 1 and args.queries[0] != "-"
+        backend = "mmap" if single and not args.input else "memory"
+    lookup = backend_lookup(backend)
+
+    # As for regions, results for genes read from stdin are flushed as they
+    # are printed
+    flush = "-" in args.queries
+    all_found = True
+    for query in iter_queries(args.queries, args.input, sys.stdin):
+        result = lookup(query)
+        all_found = all_found and result is not None
+        line = formatter(query, result)
+        if line is not None:
+            print(line, flush=flush)
+
+    if not all_found:
+        sys.exit(1)
+
+
+def annotate_bed_main(argv):
+    """
+    Parses command line arguments and prints the given BED files (or stdin)
+    on stdout with an extra column listing the genes overlapping each record
+    (comma separated, or "." if none). Exits with status 1 if a line is not a
+    BED record.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="hgfind annotate-bed",
+        description="Annotate BED records with the human genes (hg38) they "
+        "overlap",
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        metavar="FILE",
+        help="A BED file, optionally gzipped, or - for stdin (the default)",
+    )
+    parser.add_argument(
+        "-s",
+        "--sorted",
+        action="store_true",
+        help="The records are sorted by start within each chromosome: "
+        "annotate them as they are read, in input order and constant memory",
+    )
+    args = parser.parse_args(argv)
+
+    for path in args.inputs or ["-"]:
+        handle = sys.stdin if path == "-" else open_text(path)
+        try:
+            for line, genes in annotate_bed(handle, presorted=args.sorted):
+                if genes is None:
+                    print(line)
+                else:
+                    print(f"{line}\t{','.join(genes) or '.'}")
+        except ValueError as error:
+            print(f"{path}: {error}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+
+
+def annotate_vcf_main(argv):
+    """
+    Parses command line arguments and prints the given VCF file (or stdin) on
+    stdout with an INFO field listing the genes overlapping each variant.
+    Exits with status 1 if a line is not a VCF record.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="hgfind annotate-vcf",
+        description="Annotate VCF records with the human genes (hg38) they "
+        "overlap, streaming in constant memory",
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        default="-",
+        metavar="FILE",
+        help="A VCF file, optionally gzipped, or - for stdin (the default)",
+    )
+    parser.add_argument(
+        "--field",
+        default="GENES",
+        help="ID of the INFO field to add (default: GENES)",
+    )
+    args = parser.parse_args(argv)
+
+    handle = sys.stdin if args.input == "-" else open_text(args.input)
+    try:
+        for line in annotate_vcf(handle, field=args.field):
+            print(line)
+    except ValueError as error:
+        print(f"{args.input}: {error}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+SUBCOMMANDS = {
+    "region": region_main,
+    "annotate-bed": annotate_bed_main,
+    "annotate-vcf": annotate_vcf_main,
+}
+
+
+def main(argv=None):
+    """
+    Entry point of the hgfind command: dispatches to a subcommand if the first
+    argument names one, and looks up genes otherwise
+
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+
+    try:
+        if argv and argv[0] in SUBCOMMANDS:
+            SUBCOMMANDS[argv[0]](argv[1:])
+        else:
+            genes_main(argv)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away, e.g. hgfind ... | head. Point stdout at
+        # devnull, as Python flushes it again on exit and would fail again.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
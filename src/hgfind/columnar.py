@@ -0,0 +1,133 @@
+"""
+Columnar NumPy output for bulk gene lookups.
+
+Rather than one dictionary per gene, hgfind_arrays returns parallel NumPy
+arrays that can be used in vectorized code directly. NumPy is an optional
+dependency of hgfind (pip install hgfind[numpy]), and is only imported once a
+function needs it, so that importing hgfind (e.g. to run the command line
+tool) does not pay for importing NumPy.
+
+"""
+
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple
+
+from .hgfind import GENE_INDEX, GeneIndex
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class GeneArrays(NamedTuple):
+    """
+    Parallel arrays describing a batch of looked up genes; element i of every
+    array describes the i-th queried name. Unrecognized names have chromosome
+    and strand code 0, start and end coordinate -1 and official index -1.
+
+    chr_n: chromosome codes (int8), see hgfind.hgfind.CHROMOSOMES
+    start_coord: start coordinates (int64)
+    end_coord: end coordinates (int64)
+    strand: strand codes (int8): 1 for '+', -1 for '-', 0 for '+/-'
+    official_index: index into official_names of each gene's official
+        name (int64)
+    official_names: the official names of all genes in the index
+
+    """
+
+    chr_n: "np.ndarray"
+    start_coord: "np.ndarray"
+    end_coord: "np.ndarray"
+    strand: "np.ndarray"
+    official_index: "np.ndarray"
+    official_names: List[str]
+
+    @property
+    def found(self) -> "np.ndarray":
+        """
+        Boolean mask of the names that were recognized
+
+        """
+        return self.official_index >= 0
+
+
+def require_numpy():
+    """
+    Imports NumPy, raising an ImportError explaining how to install it if it
+    is missing
+
+    :returns: the numpy module
+
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            "this feature requires NumPy: pip install hgfind[numpy]"
+        ) from None
+    return numpy
+
+
+def _columns(index: GeneIndex):
+    """
+    Converts the index's GeneTable to NumPy arrays, with one extra sentinel
+    row at the end describing unrecognized names, so that a row of -1 picks
+    out the sentinel.
+
+    """
+    np = require_numpy()
+    table = index.table
+
+    def column(values, dtype, missing):
+        return np.append(np.frombuffer(values, dtype=dtype), dtype(missing))
+
+    return (
+        column(table.chrom, np.int8, 0),
+        column(table.start, np.int64, -1),
+        column(table.end, np.int64, -1),
+        column(table.strand, np.int8, 0),
+    )
+
+
+def hgfind_arrays(genes: Iterable[str]) -> GeneArrays:
+    """
+    Looks up many gene names at once, returning the results as parallel NumPy
+    arrays instead of one dictionary per gene.
+
+    :param genes: an iterable of gene names (case insensitive)
+    :returns: a GeneArrays with one element per name, in order
+
+    """
+
+    np = require_numpy()
+
+    resolve = GENE_INDEX.resolve
+    row_of = GENE_INDEX.table.row_of
+
+    rows = np.fromiter(
+        (row_of.get(resolve(gene), -1) for gene in genes), dtype=np.int64
+    )
+    return rows_to_arrays(rows)
+
+
+def rows_to_arrays(rows: "np.ndarray") -> GeneArrays:
+    """
+    Describes genes given by their rows in GENE_INDEX.table as parallel NumPy
+    arrays, e.g. to process every gene with np.arange(len(GENE_INDEX.table)).
+
+    :param rows: array of GeneTable rows (int64); -1 stands for a missing gene
+    :returns: a GeneArrays with one element per row, in order
+
+    """
+
+    require_numpy()
+
+    table = GENE_INDEX.table
+    chrom, start, end, strand = GENE_INDEX.derived("columnar", _columns)
+
+    return GeneArrays(
+        chr_n=chrom[rows],
+        start_coord=start[rows],
+        end_coord=end[rows],
+        strand=strand[rows],
+        official_index=rows,
+        official_names=table.names,
+    )
@@ -0,0 +1,110 @@
+"""
+Gene density along the genome in fixed-width bins, computed with NumPy.
+
+"""
+
+from typing import TYPE_CHECKING, Dict, NamedTuple
+
+from .columnar import require_numpy
+from .hgfind import CHROMOSOME_LENGTHS, CHROMOSOMES, GENE_INDEX, Chromosome
+from .table import GeneTable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class GeneDensity(NamedTuple):
+    """
+    Gene density along one chromosome. Element k of both arrays describes
+    bin k, which spans bases k * bin_size + 1 to (k + 1) * bin_size; the last
+    bin ends at the end of the chromosome.
+
+    counts: the number of genes overlapping each bin (int64)
+    covered: the number of bases in each bin covered by at least one gene
+        (int64)
+
+    """
+
+    counts: "np.ndarray"
+    covered: "np.ndarray"
+
+
+def _chromosome_density(
+    start: "np.ndarray", end: "np.ndarray", length: int, bin_size: int
+) -> GeneDensity:
+    """
+    Computes the density of the genes with the given start and end
+    coordinates, sorted by start, along a chromosome of the given length
+
+    """
+    np = require_numpy()
+    n_bins = -(-length // bin_size)
+
+    # Every gene adds one to the bins from its first to its last
+    first_bin = (start - 1) // bin_size
+    last_bin = (end - 1) // bin_size
+    steps = np.bincount(first_bin, minlength=n_bins + 1) - np.bincount(
+        last_bin + 1, minlength=n_bins + 1
+    )
+    counts = np.cumsum(steps)[:n_bins]
+
+    # Merge the genes into disjoint runs: a run starts wherever a gene starts
+    # after every earlier gene has ended
+    reach = np.maximum.accumulate(end)
+    run_first = np.flatnonzero(np.append(True, start[1:] > reach[:-1]))
+    run_start = start[run_first]
+    run_end = reach[np.append(run_first[1:] - 1, len(start) - 1)]
+    run_length = run_end - run_start + 1
+    run_total = np.append(0, np.cumsum(run_length))
+
+    # Count the covered bases up to every bin boundary; the runs before the
+    # run containing (or preceding) a boundary are fully covered
+    boundary = np.arange(n_bins + 1, dtype=np.int64) * bin_size
+    boundary[-1] = length
+    runs = np.searchsorted(run_start, boundary, side="right")
+    last = np.maximum(runs - 1, 0)
+    partial = np.minimum(boundary - run_start[last] + 1, run_length[last])
+    covered_to = np.where(runs > 0, run_total[last] + partial, 0)
+
+    return GeneDensity(counts=counts, covered=np.diff(covered_to))
+
+
+def _density(table: GeneTable, bin_size: int) -> Dict[Chromosome, GeneDensity]:
+    np = require_numpy()
+    start = np.frombuffer(table.start, dtype=np.int64)
+    end = np.frombuffer(table.end, dtype=np.int64)
+
+    densities = {}
+    for chr_code, (first, stop) in table.chrom_rows.items():
+        length = max(CHROMOSOME_LENGTHS[chr_code], int(end[first:stop].max()))
+        density = _chromosome_density(
+            start[first:stop], end[first:stop], length, bin_size
+        )
+        for array in density:
+            # The arrays are cached and shared between callers
+            array.flags.writeable = False
+        densities[CHROMOSOMES[chr_code]] = density
+    return densities
+
+
+def gene_density(bin_size: int) -> Dict[Chromosome, GeneDensity]:
+    """
+    Bins every chromosome into fixed-width bins and counts the genes
+    overlapping each bin and the bases in it that genes cover. Results are
+    cached per bin size.
+
+    :param bin_size: the width of the bins in base pairs
+    :returns: a dictionary mapping every chromosome with genes to its
+        GeneDensity, in genome order; as Chromosomes compare equal to their
+        codes, e.g. [23] picks out chromosome X. The arrays are read-only.
+    :raises ValueError: if bin_size is not a positive integer
+
+    """
+    require_numpy()
+
+    if not isinstance(bin_size, int) or bin_size <= 0:
+        raise ValueError(f"bin size must be a positive integer: {bin_size}")
+
+    return GENE_INDEX.derived(
+        f"density:{bin_size}", lambda index: _density(index.table, bin_size)
+    )
@@ -5,23 +5,81 @@ Module for converting a gene name to its coordinates on hg38
 Author: Nahin Khan <mnahinkhan@gmail.com>
 """
 
-import argparse
 import os
-import pickle
+import re
 import sys
+import threading
 from pathlib import Path
-from typing import Dict, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from .cache import dump_pickle, load_pickle
+from .table import GeneTable
+from .typos import NameSuggester
 
 PATH_TO_BIO_MART = Path(__file__).parent / "biomart-gene-coordinates.txt"
-PATH_TO_PICKLE = Path(__file__).parent / "biomart-gene-coordinates.pickle"
+
+# Bump whenever the pickled lookup dictionaries change shape
+PICKLE_FORMAT_VERSION = 1
+# Bump whenever the pickled ambiguous name index changes shape
+MATCHES_FORMAT_VERSION = 1
+
+# Environment variable selecting the index that hgfind() answers from
+BACKEND_ENV = "HGFIND_BACKEND"
+# The indexes hgfind() can answer from: the resident dictionaries, the
+# memory-mapped binary index (see hgfind.binindex) and the SQLite database
+# (see hgfind.sqlindex)
+BACKENDS = ("memory", "mmap", "sqlite")
+# The backend hgfind() answers from unless told otherwise, read from the
+# environment once rather than on every lookup
+DEFAULT_BACKEND = os.environ.get(BACKEND_ENV) or "memory"
+
+T = TypeVar("T")
 
 
 class WrongGeneName(Exception):
     """
-    Exception raised when a gene name is not recognized
+    Exception raised when a gene name is not recognized. Its argument is a
+    dictionary with a 'message' and the 'gene' as looked up (upper-cased).
+    Known names close to the gene are only searched for when its suggestions
+    are first read, or when it is printed, as most misses are never shown.
 
     """
 
+    def __init__(self, *args, gene: Optional[str] = None):
+        super().__init__(*args)
+        # The name as given, which suggestions are searched for
+        self.gene = gene
+        self._suggestions: Optional[List[str]] = None
+
+    @property
+    def suggestions(self) -> List[str]:
+        """
+        Known names close to the unrecognized one, nearest first
+
+        """
+        if self._suggestions is None:
+            self._suggestions = (
+                [] if self.gene is None else GENE_INDEX.suggest(self.gene)
+            )
+        return self._suggestions
+
+    def __str__(self):
+        if len(self.args) == 1 and isinstance(self.args[0], dict):
+            return str(dict(self.args[0], suggestions=self.suggestions))
+        return super().__str__()
+
 
 class Chromosome:
     """
@@ -85,80 +143,854 @@ class Chromosome:
         return self.chr_n
 
 
-def hgfind(gene: str) -> Dict:
+# Every chromosome, indexed by its integer code (index 0 is unused)
+CHROMOSOMES = (None,) + tuple(
+    Chromosome(n) for n in [*range(1, 23), "X", "Y", "MT"]
+)
+
+# Lengths of the hg38 (GRCh38) chromosomes in base pairs, indexed like
+# CHROMOSOMES
+CHROMOSOME_LENGTHS = (
+    0,
+    248956422,
+    242193529,
+    198295559,
+    190214555,
+    181538259,
+    170805979,
+    159345973,
+    145138636,
+    138394717,
+    133797422,
+    135086622,
+    133275309,
+    114364328,
+    107043718,
+    101991189,
+    90338345,
+    83257441,
+    80373285,
+    58617616,
+    64444167,
+    46709983,
+    50818468,
+    156040895,
+    57227415,
+    16569,
+)
+
+
+# HGNC symbols spell Greek letters with Latin ones, e.g. TNF-alpha is TNFA.
+# Spelled out Greek letters are only replaced after another character and
+# before a digit or the end of a name; those too short to tell apart from
+# other text (eta, mu, ...) are only replaced when written as letters.
+GREEK_LETTERS = {
+    "ALPHA": "A",
+    "BETA": "B",
+    "GAMMA": "G",
+    "DELTA": "D",
+    "EPSILON": "E",
+    "ZETA": "Z",
+    "THETA": "Q",
+    "IOTA": "I",
+    "KAPPA": "K",
+    "LAMBDA": "L",
+    "SIGMA": "S",
+}
+_GREEK_CHARACTERS = {
+    "α": "A",  # alpha
+    "β": "B",  # beta
+    "γ": "G",  # gamma
+    "δ": "D",  # delta
+    "ε": "E",  # epsilon
+    "ζ": "Z",  # zeta
+    "η": "H",  # eta
+    "θ": "Q",  # theta
+    "ι": "I",  # iota
+    "κ": "K",  # kappa
+    "λ": "L",  # lambda
+    "μ": "M",  # mu
+    "σ": "S",  # sigma
+    "ς": "S",  # final sigma
+}
+_GREEK_TRANSLATION = str.maketrans(
+    {
+        **_GREEK_CHARACTERS,
+        **{char.upper(): latin for char, latin in _GREEK_CHARACTERS.items()},
+    }
+)
+_GREEK_WORD = re.compile("(?<=.)(" + "|".join(GREEK_LETTERS) + r")(?=\d|$)")
+_DASHES = "\u2010\u2011\u2012\u2013\u2014\u2015\u2212"
+_HYPHENATION = str.maketrans(dict.fromkeys(_DASHES, "-"))
+# Whitespace, dots, and hyphens and dashes of every kind
+_SEPARATORS = re.compile(rf"[\s.\-{_DASHES}]+")
+
+
+def normalize_name(name: str) -> str:
+    """
+    Converts a gene name to its canonical key: upper case, without
+    whitespace, dots or hyphens, and with Greek letters (written as letters
+    or spelled out) replaced by their Latin counterparts as in HGNC symbols,
+    so that e.g. "IL-1 beta", "il1β" and "IL1B" share a key.
+
+    :param name: a gene name
+    :returns: the canonical key of the name
+
+    """
+    key = _SEPARATORS.sub("", name.translate(_GREEK_TRANSLATION)).upper()
+    return _GREEK_WORD.sub(lambda word: GREEK_LETTERS[word.group()], key)
+
+
+def query_keys(gene: str) -> Iterator[str]:
+    """
+    Yields the keys to look a gene name up by in the dictionary built by
+    resolution_keys, in order: the name upper-cased, then with its hyphens
+    and dashes unified, then its canonical key (see normalize_name). Each key
+    is only computed once the previous one has been tried, and keys equal to
+    the previous one are skipped.
+
+    :param gene: the name of a gene
+    :returns: an iterator over the keys of the name
+
+    """
+    key = gene.upper()
+    yield key
+    hyphenated = gene.strip().translate(_HYPHENATION).upper()
+    if hyphenated != key:
+        yield hyphenated
+    canonical = normalize_name(gene)
+    if canonical != hyphenated:
+        yield canonical
+
+
+def resolution_keys(
+    name_to_official: Dict[str, str], official_to_coord: Dict
+) -> Dict[str, str]:
+    """
+    Builds the dictionary of keys that gene names are resolved through (see
+    GeneIndex.resolve): the upper case gene names, followed by the other
+    names upper-cased, as hgfind() upper-cases its query while BioMart lists
+    some names in lower case, and the canonical keys of the names (see
+    normalize_name). Where several names share a key, upper case names take
+    precedence over upper-cased names and those over canonical keys, official
+    names over synonyms, and earlier names over later ones.
+
+    Looking the keys of query_keys(gene) up in turn resolves a gene name as
+    GeneIndex.resolve does, so that indexes storing this dictionary answer
+    exactly like the resident one.
+
+    :param name_to_official: gene name -> official name dictionary
+    :param official_to_coord: official name -> genome location dictionary
+    :returns: key -> official name dictionary
+
+    """
+    names = [
+        (name, official_name)
+        for name, official_name in name_to_official.items()
+        if official_name in official_to_coord
+    ]
+    keys: Dict[str, str] = {
+        name: official_name
+        for name, official_name in names
+        if name == name.upper()
+    }
+    names.sort(key=lambda item: item[0] != item[1])
+    for name, official_name in names:
+        keys.setdefault(name.upper(), official_name)
+    for name, official_name in names:
+        keys.setdefault(normalize_name(name), official_name)
+    return keys
+
+
+def _is_pair(contents: Any) -> bool:
+    return isinstance(contents, (tuple, list)) and len(contents) == 2
+
+
+def dump_dicts(
+    path: Union[str, Path], name_to_official: Dict, official_to_coord: Dict
+):
+    """
+    Atomically writes the two dictionaries produced by file_to_dicts to a
+    pickle file that load_dicts can read back.
+
+    :param path: where to write the pickle file
+    :param name_to_official: gene name -> official name dictionary
+    :param official_to_coord: official name -> genome location dictionary
+
+    """
+
+    dump_pickle(path, (name_to_official, official_to_coord))
+
+
+def load_dicts(
+    path: Union[str, Path] = PATH_TO_BIO_MART, processes: Optional[int] = 1
+):
+    """
+    Loads the two lookup dictionaries produced by file_to_dicts, reading them
+    from the user's pickle cache or the one prebuilt into the package if
+    possible, and regenerating (and caching) them from the BioMart file
+    otherwise. Caches are content addressed (see hgfind.cache), so a cache
+    built from a different BioMart file, hgfind version or cache format is
+    never loaded. Regeneration holds an inter-process lock, so concurrently
+    starting processes parse the BioMart file only once between them.
+
+    :param path: path to BioMart file specifying gene coordinates
+    :param processes: number of processes to parse the file with if needed,
+        see file_to_dicts
+    :returns: two dictionaries as tuple
+        (gene name -> official name, official name -> genome location)
+
+    """
+
+    def build() -> Tuple[Dict, Dict]:
+        print(
+            "Generating pickle (cache) file for faster lookup next time...",
+            file=sys.stderr,
+        )
+        return file_to_dicts(path, processes)
+
+    name_to_official, official_to_coord = load_pickle(
+        path, "pickle", PICKLE_FORMAT_VERSION, build, _is_pair
+    )
+    return name_to_official, official_to_coord
+
+
+def dump_matches(
+    path: Union[str, Path],
+    name_to_genes: Dict[str, List["GeneId"]],
+    displaced_to_coord: Dict["GeneId", Tuple],
+):
+    """
+    Atomically writes the ambiguous name index produced by file_to_index to a
+    pickle file that load_matches can read back.
+
+    :param path: where to write the pickle file
+    :param name_to_genes: ambiguous gene name -> the genes it is listed for
+    :param displaced_to_coord: displaced gene -> genome location
+
+    """
+
+    dump_pickle(path, (name_to_genes, displaced_to_coord))
+
+
+def load_matches(
+    path: Union[str, Path] = PATH_TO_BIO_MART, processes: Optional[int] = 1
+) -> Tuple[Dict, Dict]:
+    """
+    Loads the index of ambiguous gene names, from a content addressed cache
+    if possible, and by parsing (and caching) the BioMart file otherwise. It
+    is cached separately from the lookup dictionaries, as only
+    hgfind(gene, all_matches=True) needs it.
+
+    :param path: path to BioMart file specifying gene coordinates
+    :param processes: number of processes to parse the file with if needed,
+        see file_to_dicts
+    :returns: two dictionaries as tuple
+        (ambiguous gene name -> the genes it is listed for,
+         displaced gene -> genome location), see ParsedBioMart
+
+    """
+
+    def build() -> Tuple[Dict, Dict]:
+        parsed = file_to_index(path, processes)
+        return parsed.name_to_genes, parsed.displaced_to_coord
+
+    name_to_genes, displaced_to_coord = load_pickle(
+        path, "matches", MATCHES_FORMAT_VERSION, build, _is_pair
+    )
+    return name_to_genes, displaced_to_coord
+
+
+def _location(official_name: str, coord: Tuple) -> Dict:
+    """
+    Builds the dictionary hgfind() returns from an official name and its
+    genome location
+
+    """
+    chr_n, start_coord, end_coord, strand = coord
+    return {
+        "chr_n": chr_n,
+        "start_coord": start_coord,
+        "end_coord": end_coord,
+        "strand": strand,
+        "official_name": official_name,
+    }
+
+
+class GeneIndex:
+    """
+    A lazily loaded, in-memory index of the BioMart gene coordinates. The
+    lookup dictionaries are loaded on first use and then kept resident, so
+    that every subsequent query is a dictionary hit.
+
+    A process-wide instance is available as GENE_INDEX and is what hgfind()
+    uses. Initialization is thread-safe: concurrent first uses load the data
+    exactly once.
+
+    Structures derived from the dictionaries (such as the genome ordered
+    GeneTable) are likewise built on first use, kept until the index is
+    reloaded or cleared, and shared by every caller.
+
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = PATH_TO_BIO_MART,
+        processes: Optional[int] = 1,
+    ):
+        self.path = path
+        self.processes = processes
+        self._lock = threading.RLock()
+        self._dicts: Optional[Tuple[Dict, Dict]] = None
+        self._derived: Dict[str, Any] = {}
+
+    def _get_dicts(self) -> Tuple[Dict, Dict]:
+        dicts = self._dicts
+        if dicts is None:
+            with self._lock:
+                if self._dicts is None:
+                    self._dicts = load_dicts(self.path, self.processes)
+                dicts = self._dicts
+        return dicts
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        True iff the lookup dictionaries are currently held in memory
+
+        """
+        return self._dicts is not None
+
+    @property
+    def name_to_official(self) -> Dict[str, str]:
+        """
+        Dictionary mapping every known gene name to its official name
+
+        """
+        return self._get_dicts()[0]
+
+    @property
+    def official_to_coord(self) -> Dict:
+        """
+        Dictionary mapping official gene names to their genome location as
+        (chromosome, start coordinate, end coordinate, strand)
+
+        """
+        return self._get_dicts()[1]
+
+    @property
+    def table(self) -> GeneTable:
+        """
+        The official genes as parallel typed arrays in genome order
+
+        """
+        return self.derived(
+            "table", lambda index: GeneTable(index.official_to_coord)
+        )
+
+    def derived(self, key: str, build: Callable[["GeneIndex"], T]) -> T:
+        """
+        Returns the structure stored under the given key, building it from
+        this index with build(self) on first use.
+
+        :param key: a name identifying the derived structure
+        :param build: function building the structure from this index
+        :returns: the (possibly just built) derived structure
+
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._derived:
+                self._derived[key] = build(self)
+            return self._derived[key]
+
+    def lookup_exact(self, gene: str) -> Optional[Dict]:
+        """
+        Looks up a gene name exactly as given (no case normalization).
+
+        :param gene: the name of a gene
+        :returns: the same dictionary as hgfind() on success, None otherwise
+
+        """
+        name_to_official, official_to_coord = self._get_dicts()
+        official_name = name_to_official.get(gene)
+        if official_name is None or official_name not in official_to_coord:
+            return None
+
+        return _location(official_name, official_to_coord[official_name])
+
+    def resolve(self, gene: str) -> Optional[str]:
+        """
+        Finds the official name of a gene name, ignoring case. Names are
+        looked up upper-cased first, as they mostly appear in BioMart, and
+        only if that fails by the keys of query_keys(gene) in the dictionary
+        built by resolution_keys, which is built on first miss.
+
+        :param gene: the name of a gene
+        :returns: the official name of the gene, or None if not recognized
+
+        """
+        name_to_official, official_to_coord = self._get_dicts()
+        official_name = name_to_official.get(gene.upper())
+        if official_name in official_to_coord:
+            return official_name
+
+        keys = self.derived(
+            "normalized",
+            lambda index: resolution_keys(
+                index.name_to_official, index.official_to_coord
+            ),
+        )
+        for key in query_keys(gene):
+            official_name = keys.get(key)
+            if official_name is not None:
+                return official_name
+        return None
+
+    def lookup(self, gene: str) -> Optional[Dict]:
+        """
+        Looks up a gene name as hgfind() does, ignoring case and falling back
+        on the canonical keys of the names (see resolve).
+
+        :param gene: the name of a gene
+        :returns: the same dictionary as hgfind() on success, None otherwise
+
+        """
+        official_name = self.resolve(gene)
+        if official_name is None:
+            return None
+        return _location(official_name, self.official_to_coord[official_name])
+
+    def suggest(self, gene: str, limit: int = 5) -> List[str]:
+        """
+        Suggests known gene names within two edits of an unrecognized one,
+        with the index of names built on first use (see NameSuggester).
+
+        :param gene: the name of a gene (case insensitive)
+        :param limit: the largest number of names to suggest
+        :returns: up to limit gene names, nearest first
+
+        """
+
+        def build(index: "GeneIndex") -> NameSuggester:
+            official_to_coord = index.official_to_coord
+            return NameSuggester(
+                name
+                for name, official_name in index.name_to_official.items()
+                if official_name in official_to_coord
+            )
+
+        return self.derived("suggester", build).suggest(gene, limit)
+
+    def lookup_all(self, gene: str) -> List[Dict]:
+        """
+        Looks up every gene a gene name is listed for, resolving the name as
+        lookup() does: the genes listed under the first of the query_keys of
+        the name that is listed for the gene it resolves to. Names that do
+        not resolve to a gene, e.g. synonyms of several genes that BioMart
+        lists as their own official name, get the genes listed under the
+        first of their query_keys that is listed for any. The index of
+        ambiguous names is loaded on first use.
+
+        :param gene: the name of a gene
+        :returns: a list of dictionaries like the one lookup() returns, one
+            per gene, starting with the one lookup() returns if any; empty
+            if the name is not recognized
+
+        """
+        result = self.lookup(gene)
+        name_to_genes, displaced_to_coord = self.derived(
+            "matches", lambda index: load_matches(index.path, index.processes)
+        )
+        # The ambiguous names by the keys names are resolved through
+        keys = self.derived(
+            "match_keys",
+            lambda index: resolution_keys(
+                {name: name for name in name_to_genes}, name_to_genes
+            ),
+        )
+        official_to_coord = self.official_to_coord
+        for key in query_keys(gene):
+            name = keys.get(key)
+            if name is None:
+                continue
+            results = []
+            for official_name, chr_code in name_to_genes[name]:
+                coord = official_to_coord.get(official_name)
+                if coord is None or coord[0] != chr_code:
+                    coord = displaced_to_coord[official_name, chr_code]
+                results.append(_location(official_name, coord))
+            if result is None:
+                return results
+            if result in results:
+                results.remove(result)
+                return [result] + results
+        return [] if result is None else [result]
+
+    def reload(self):
+        """
+        Reloads the lookup dictionaries from the cache or BioMart file
+
+        """
+        with self._lock:
+            self._derived = {}
+            self._dicts = load_dicts(self.path, self.processes)
+
+    def clear(self):
+        """
+        Drops the resident dictionaries; they are loaded again on next use
+
+        """
+        with self._lock:
+            self._derived = {}
+            self._dicts = None
+
+
+GENE_INDEX = GeneIndex()
+
+# The on-disk indexes opened by backend_lookup, by backend
+_backend_indexes: Dict[str, Any] = {}
+_backend_lock = threading.Lock()
+
+
+def backend_lookup(
+    backend: Optional[str] = None,
+) -> Callable[[str], Optional[Dict]]:
+    """
+    Returns the function looking gene names up in one of the indexes hgfind()
+    can answer from. The on-disk indexes are built from the BioMart file of
+    GENE_INDEX if needed, opened on first use and then shared by the process.
+
+    :param backend: one of BACKENDS; defaults to DEFAULT_BACKEND, which is
+        $HGFIND_BACKEND if set when hgfind is imported, and "memory" (the
+        resident GENE_INDEX) otherwise
+    :returns: a function resolving a gene name as hgfind() does, returning
+        the same dictionary as hgfind() on success and None otherwise
+    :raises ValueError: for an unknown backend
+
+    """
+    if backend is None:
+        backend = DEFAULT_BACKEND
+    if backend == "memory":
+        return GENE_INDEX.lookup
+
+    index = _backend_indexes.get(backend)
+    if index is None:
+        with _backend_lock:
+            index = _backend_indexes.get(backend)
+            if index is None:
+                # Imported here, as both modules import this one
+                if backend == "mmap":
+                    from .binindex import load_mapped_index as load
+                elif backend == "sqlite":
+                    from .sqlindex import load_sqlite_index as load
+                else:
+                    raise ValueError(
+                        f"backend must be one of {', '.join(BACKENDS)}"
+                    )
+                index = load(bio_mart_path=GENE_INDEX.path)
+                _backend_indexes[backend] = index
+    return index.lookup
+
+
+def hgfind(
+    gene: str, all_matches: bool = False, backend: Optional[str] = None
+) -> Union[Dict, List[Dict]]:
     """
     Given a string containing a gene name from the human genome, returns its
     location on hg38.
 
-    :param gene: a string representing the name of a human gene.
+    :param gene: a string representing the name of a human gene. Case,
+      whitespace, dots and hyphens are ignored where that is unambiguous,
+      and Greek letters may be written out (see normalize_name).
+    :param all_matches: whether to return every gene the name is listed for
+      (e.g. a synonym shared by several genes) rather than just the one it
+      resolves to
+    :param backend: the index to look the name up in, one of BACKENDS (see
+      backend_lookup); every match is looked up in the resident index
     :returns: On success, a dictionary containing the following keys and
       associated values:
         'chr_n': the Chromosome object on which the gene lies
         'start_coord': the start coordinate of the gene on the chromosome
         'end_coord': the end coordinate of the gene on the chromosome
         'official_name': the standardized name for the specified gene
+      With all_matches, a list of such dictionaries, starting with the one
+      returned without it if any.
       On failure, an exception is raised
 
     """
 
-    is_not_pickled = True
-    if os.path.isfile(PATH_TO_PICKLE):
-        is_not_pickled = False
-        with open(PATH_TO_PICKLE, "rb") as handle:
-            try:
-                name_to_official, official_to_coord = pickle.load(handle)
-            except (
-                ModuleNotFoundError,
-                AttributeError,
-                ValueError,
-                PermissionError,
-            ):
-                is_not_pickled = True
-
-    if is_not_pickled:
-        name_to_official, official_to_coord = file_to_dicts(PATH_TO_BIO_MART)
-        # Create parent dir if needed
-        Path(PATH_TO_PICKLE).parent.mkdir(parents=True, exist_ok=True)
-        try:
-            print(
-                "Generating pickle (cache) file for faster lookup next time...",
-                file=sys.stderr,
-            )
-            with open(PATH_TO_PICKLE, "wb") as handle:
-                pickle.dump(
-                    [name_to_official, official_to_coord],
-                    handle,
-                    protocol=pickle.HIGHEST_PROTOCOL,
-                )
-        except PermissionError:
-            print(
-                "Could not cache due to permission errors...", file=sys.stderr
-            )
+    if all_matches:
+        rna_info = GENE_INDEX.lookup_all(gene) or None
+    else:
+        rna_info = backend_lookup(backend)(gene)
+    if rna_info is None:
+        raise unrecognized_gene(gene)
 
-    gene = gene.upper()
+    return rna_info
 
-    if (
-        gene in name_to_official
-        and name_to_official[gene] in official_to_coord
-    ):
-        rna_info = {}
-        (
-            rna_info["chr_n"],
-            rna_info["start_coord"],
-            rna_info["end_coord"],
-            rna_info["strand"],
-        ) = official_to_coord[name_to_official[gene]]
-        rna_info["official_name"] = name_to_official[gene]
 
-    else:
-        raise WrongGeneName(
-            {"message": "The input gene could not be recognized", "gene": gene}
+def lookup(gene: str, backend: Optional[str] = None) -> Optional[Dict]:
+    """
+    Looks up a gene name like hgfind(), but returns None rather than raising
+    WrongGeneName if the name is not recognized. Misses therefore cost
+    neither an exception nor the search for suggestions of close names,
+    which suits streams consisting mostly of tokens other than gene names.
+
+    :param gene: a string representing the name of a human gene
+    :param backend: the index to look the name up in, one of BACKENDS (see
+      backend_lookup)
+    :returns: the same dictionary as hgfind() on success, None otherwise
+
+    """
+    return backend_lookup(backend)(gene)
+
+
+def unrecognized_gene(gene: str) -> WrongGeneName:
+    """
+    Creates the WrongGeneName to raise for an unrecognized gene name, which
+    suggests known names close to it when asked
+
+    """
+    return WrongGeneName(
+        {
+            "message": "The input gene could not be recognized",
+            "gene": gene.upper(),
+        },
+        gene=gene,
+    )
+
+
+def hgfind_many(
+    genes: Iterable[str], on_missing: str = "collect"
+) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Resolves many gene names at once against the resident gene index. This
+    is equivalent to calling hgfind() on every name, but without the cost of
+    raising and catching WrongGeneName for every unrecognized name.
+
+    :param genes: an iterable of gene names (case insensitive)
+    :param on_missing: what to do with unrecognized names:
+        'collect': return them in the list of unrecognized names
+        'skip': leave them out of the result silently
+        'raise': raise WrongGeneName on the first one
+    :returns: a tuple of
+        (a dictionary mapping every recognized name, as given, to the same
+         dictionary hgfind() returns for it,
+         the unrecognized names, as given, in order of first appearance)
+
+    """
+
+    if on_missing not in ("collect", "skip", "raise"):
+        raise ValueError("on_missing must be 'collect', 'skip' or 'raise'")
+
+    official_to_coord = GENE_INDEX.official_to_coord
+
+    results: Dict[str, Dict] = {}
+    missing: List[str] = []
+    seen_missing = set()
+
+    for gene in genes:
+        if gene in results or gene in seen_missing:
+            continue
+
+        official_name = GENE_INDEX.resolve(gene)
+        coord = official_to_coord.get(official_name)
+        if coord is None:
+            if on_missing == "raise":
+                raise unrecognized_gene(gene)
+            seen_missing.add(gene)
+            if on_missing == "collect":
+                missing.append(gene)
+            continue
+
+        chr_n, start_coord, end_coord, strand = coord
+        results[gene] = {
+            "chr_n": chr_n,
+            "start_coord": start_coord,
+            "end_coord": end_coord,
+            "strand": strand,
+            "official_name": official_name,
+        }
+
+    return results, missing
+
+
+# A parsed BioMart row: (start coordinate, end coordinate, gene name,
+# all non-empty names, chromosome code, strand)
+Row = Tuple[int, int, str, List[str], int, str]
+
+# A gene as identified while merging BioMart rows: (official name,
+# chromosome code). Official names are unique but for genes listed on
+# several chromosomes.
+GeneId = Tuple[str, int]
+
+
+class ParsedBioMart(NamedTuple):
+    """
+    Everything gathered from a BioMart file in its single merge pass
+
+    name_to_official: gene name -> official name
+    official_to_coord: official name -> genome location as (chromosome,
+        start coordinate, end coordinate, strand)
+    loci: official name -> (start coordinates, end coordinates, strands) of
+        its rows, in file order
+    name_to_genes: ambiguous gene name -> every gene (as a GeneId) it is
+        listed for, starting with the gene it resolves to if it resolves to
+        any; names listed for exactly the gene they resolve to are left out
+    displaced_to_coord: GeneId -> genome location of the genes whose
+        official name belongs to a gene on another chromosome in
+        official_to_coord
+
+    loci, name_to_genes and displaced_to_coord are only gathered by a full
+    parse (see file_to_index), and are empty otherwise.
+
+    """
+
+    name_to_official: Dict[str, str]
+    official_to_coord: Dict
+    loci: Dict[str, Tuple[List[int], List[int], List[str]]]
+    name_to_genes: Dict[str, List[GeneId]]
+    displaced_to_coord: Dict[GeneId, Tuple]
+
+
+def _parse_chr_no(str_chr_no: str) -> Optional[Chromosome]:
+    """
+    Converts the Chromosome/scaffold name of a BioMart row to a Chromosome,
+    returning None for scaffolds that cannot be attributed to a chromosome
+
+    """
+
+    if str_chr_no in ("X", "Y", "MT"):
+        return Chromosome(str_chr_no)
+
+    if len(str_chr_no) <= 2:
+        return Chromosome(int(str_chr_no))
+
+    if "HSCHR" in str_chr_no.upper():
+        str_chr_no = str_chr_no[
+            str_chr_no.upper().find("HSCHR") : str_chr_no.upper().find("HSCHR")
+            + 7
+        ]
+
+        str_chr_no = str_chr_no[5:]
+
+        if str_chr_no[1].isdigit():
+            return Chromosome(int(str_chr_no))
+
+        if str_chr_no[0] == "X" or str_chr_no[0] == "Y":
+            return Chromosome(str_chr_no[0])
+
+        if str_chr_no == "MT":
+            return Chromosome(str_chr_no)
+
+        return Chromosome(int(str_chr_no[0]))
+
+    return None
+
+
+def _parse_rows(path: Union[str, Path], start: int, stop: int) -> List[Row]:
+    """
+    Parses the rows of the BioMart file that begin within the byte range
+    [start, stop), skipping rows on unplaced scaffolds. Splitting a file into
+    adjacent byte ranges therefore parses every row exactly once.
+
+    :param path: path to BioMart file specifying gene coordinates
+    :param start: offset of the first byte of the range
+    :param stop: offset one past the last byte of the range
+    :returns: the parsed rows, in file order
+
+    """
+
+    with open(path, "rb") as bio_mart_file:
+        if start > 0:
+            # Skip the rest of the row the previous range ends in
+            bio_mart_file.seek(start - 1)
+            bio_mart_file.readline()
+
+        first = bio_mart_file.tell()
+        if first >= stop:
+            return []
+
+        data = bio_mart_file.read(stop - first)
+        if not data.endswith(b"\n"):
+            # Complete the last row, which begins within the range
+            data += bio_mart_file.readline()
+
+    rows: List[Row] = []
+    # Most rows share a handful of chromosome names, so convert each only once
+    chr_codes: Dict[str, Optional[int]] = {}
+
+    for line in data.decode().split("\n"):
+        if not line:
+            continue
+
+        (
+            start_coord,
+            end_coord,
+            gene_name,
+            gene_syn_name,
+            wiki_name,
+            uniprot_name,
+            str_chr_no,
+            strand,
+        ) = [wss.strip() for wss in line.split("\t")]
+
+        if str_chr_no not in chr_codes:
+            chr_no = _parse_chr_no(str_chr_no)
+            chr_codes[str_chr_no] = None if chr_no is None else int(chr_no)
+        chr_code = chr_codes[str_chr_no]
+        if chr_code is None:
+            continue
+
+        names = [
+            name
+            for name in [gene_name, gene_syn_name, wiki_name, uniprot_name]
+            if name != ""
+        ]
+
+        rows.append(
+            (
+                int(start_coord),
+                int(end_coord),
+                gene_name,
+                names,
+                chr_code,
+                strand,
+            )
         )
 
-    return rna_info
+    return rows
+
 
+def _split_file(
+    path: Union[str, Path], n_chunks: int
+) -> List[Tuple[int, int]]:
+    """
+    Splits the rows of the BioMart file (excluding the header) into at most
+    n_chunks adjacent byte ranges of roughly equal size
 
-def file_to_dicts(path):
+    """
+
+    with open(path, "rb") as bio_mart_file:
+        # This first line just says "Gene start (bp), Gene end (bp), Gene name,
+        # Gene Synonym, WikiGene name, UniProtKB Gene Name symbol,
+        # Chromosome/Scaffold Name"
+        bio_mart_file.readline()
+        first = bio_mart_file.tell()
+        size = os.fstat(bio_mart_file.fileno()).st_size
+
+    step = max(1, -(-(size - first) // n_chunks))
+    return [
+        (chunk_start, min(chunk_start + step, size))
+        for chunk_start in range(first, size, step)
+    ]
+
+
+def file_to_dicts(path, processes: Optional[int] = 1):
     """
     This function converts the BioMart file given by the path into two
     dictionaries: the first one takes a gene name as a key and gives as value
@@ -167,150 +999,204 @@ def file_to_dicts(path):
     and the end coordinate as its value.
 
     :param path: path to BioMart file specifying gene coordinates
+    :param processes: number of processes to parse the file with; None uses
+        one per CPU
     :returns: two dictionaries as tuple
         (gene name -> official name, official name -> genome location)
 
     """
 
-    name_to_official: Dict[str, str] = {}
-    official_to_coord = {}
+    parsed = file_to_index(path, processes, full=False)
+    return parsed.name_to_official, parsed.official_to_coord
 
-    with open(path) as bio_mart_file:
-        # This first line just says "Gene start (bp), Gene end (bp), Gene name,
-        # Gene Synonym, WikiGene name, UniProtKB Gene Name symbol,
-        # Chromosome/Scaffold Name"
-        bio_mart_file.readline()
 
-        # To get to an actual line:
-        line = bio_mart_file.readline()
-        while line:
+def file_to_index(
+    path, processes: Optional[int] = 1, full: bool = True
+) -> ParsedBioMart:
+    """
+    Converts the BioMart file given by the path into the two dictionaries
+    returned by file_to_dicts, along with the individual loci of the rows
+    that each official gene's location spans, and every gene that each
+    ambiguous name is listed for.
 
-            (
-                start_coord,
-                end_coord,
-                gene_name,
-                gene_syn_name,
-                wiki_name,
-                uniprot_name,
-                str_chr_no,
-                strand,
-            ) = [wss.strip() for wss in line.split("\t")]
+    Parsing happens in two stages: the rows of the file are parsed in chunks,
+    optionally spread over a pool of processes, and are then merged in file
+    order. The merge is sequential, so the result does not depend on the
+    number of processes.
 
-            names = [
-                name
-                for name in [gene_name, gene_syn_name, wiki_name, uniprot_name]
-                if name != ""
-            ]
+    :param path: path to BioMart file specifying gene coordinates
+    :param processes: number of processes to parse the file with; None uses
+        one per CPU
+    :param full: whether to gather the loci and ambiguous names too; if not,
+        they are left empty and the merge is about three times as fast
+    :returns: a ParsedBioMart
 
-            if str_chr_no in ("X", "Y", "MT"):
-                chr_no = Chromosome(str_chr_no)
+    """
 
-            elif len(str_chr_no) <= 2:
-                chr_no = Chromosome(int(str_chr_no))
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes > 1:
+        # Imported here, as only parallel parses need it and it takes a while
+        # to import
+        from concurrent.futures import ProcessPoolExecutor
+
+        # A few chunks per process evens out differences in parsing speed
+        chunks = _split_file(path, 4 * processes)
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            parsed = list(
+                executor.map(
+                    _parse_rows,
+                    [path] * len(chunks),
+                    [chunk_start for chunk_start, _ in chunks],
+                    [chunk_stop for _, chunk_stop in chunks],
+                )
+            )
+    else:
+        parsed = [
+            _parse_rows(path, chunk_start, chunk_stop)
+            for chunk_start, chunk_stop in _split_file(path, 1)
+        ]
 
-            elif "HSCHR" in str_chr_no.upper():
-                str_chr_no = str_chr_no[
-                    str_chr_no.upper()
-                    .find("HSCHR") : str_chr_no.upper()
-                    .find("HSCHR")
-                    + 7
-                ]
+    return _merge_rows((row for rows in parsed for row in rows), full)
 
-                str_chr_no = str_chr_no[5:]
 
-                if str_chr_no[1].isdigit():
-                    chr_no = Chromosome(int(str_chr_no))
+def _merge_rows(rows: Iterable[Row], full: bool = True) -> ParsedBioMart:
+    """
+    Merges parsed BioMart rows, in file order, into the dictionaries
+    returned by file_to_index. Unless full, only the lookup dictionaries are
+    gathered.
 
-                elif str_chr_no[0] == "X" or str_chr_no[0] == "Y":
-                    chr_no = Chromosome(str_chr_no[0])
+    """
 
-                elif str_chr_no == "MT":
-                    chr_no = Chromosome(str_chr_no)
+    name_to_official: Dict[str, str] = {}
+    official_to_coord = {}
+    # Every gene each name is listed for, in order of appearance (dictionaries
+    # serve as ordered sets)
+    name_to_genes: Dict[str, Dict[GeneId, None]] = {}
+    # Rows of displaced genes: genes whose official name is already taken by
+    # a gene on another chromosome
+    displaced_rows: Dict[GeneId, Tuple[List, List, List]] = {}
+
+    # Locations are kept by chromosome code while merging, as comparing codes
+    # is much cheaper than comparing Chromosome objects
+    for start_coord, end_coord, gene_name, names, chr_code, strand in rows:
+        # Maybe one of the names is already in the dictionary. Then, link all
+        # of the names to the official title for that name. Otherwise, let
+        # "gene name" be official.
+        official_name = name_to_official.get(gene_name, gene_name)
+
+        for name in names:
+            if name in name_to_official:
+                official_name = name_to_official[name]
+                if official_name not in official_to_coord:
+                    continue
 
-                else:
-                    chr_no = Chromosome(int(str_chr_no[0]))
+                prev_chr_code = official_to_coord[official_name][0]
 
-            else:
-                line = bio_mart_file.readline()
+                if prev_chr_code != chr_code:
+                    name_to_official[name] = name
+                    official_name = name
                 continue
 
-            start_coord = int(start_coord)
-            end_coord = int(end_coord)
-
-            # Maybe one of the names is already in the dictionary.Then, link all of
-            # the names to the official title for that name. Otherwise, let
-            # "gene name" be official.
-            official_name = name_to_official.get(gene_name, gene_name)
+            name_to_official[name] = official_name
 
+        gene = (official_name, chr_code)
+        if full:
             for name in names:
-                if name in name_to_official:
-                    official_name = name_to_official[name]
-                    if official_name not in official_to_coord:
-                        continue
-
-                    (
-                        prev_chr_no,
-                        prev_start_coord,
-                        prev_end_coord,
-                        prev_strand,
-                    ) = official_to_coord[official_name]
-
-                    if prev_chr_no != chr_no:
-                        name_to_official[name] = name
-                        official_name = name
-                    continue
+                name_to_genes.setdefault(name, {})[gene] = None
 
-                name_to_official[name] = official_name
+        # Now add the start and end coord of this row:
+        if official_name not in official_to_coord:
+            official_to_coord[official_name] = (chr_code, [], [], [])
 
-            # Now get the start and end coord of this row:
+        (
+            prev_chr_code,
+            prev_start_coord,
+            prev_end_coord,
+            prev_strand,
+        ) = official_to_coord[official_name]
+
+        if prev_chr_code != chr_code:
+            if not full:
+                continue
             (
-                prev_chr_no,
                 prev_start_coord,
                 prev_end_coord,
                 prev_strand,
-            ) = official_to_coord.get(official_name, (-1, [], [], []))
+            ) = displaced_rows.setdefault(gene, ([], [], []))
 
-            if int(prev_chr_no) != -1 and prev_chr_no != chr_no:
-                line = bio_mart_file.readline()
-                continue
+        prev_start_coord.append(start_coord)
+        prev_end_coord.append(end_coord)
+        prev_strand.append(strand)
 
-            new_chr_no = chr_no
-            new_start_coord = prev_start_coord + [start_coord]
-            new_end_coord = prev_end_coord + [end_coord]
-            new_strand = prev_strand + [strand]
+    loci = {}
+    for official_name, coords in official_to_coord.items():
+        chr_code, start_coord_array, end_coord_array, strand_array = coords
+        if full:
+            loci[official_name] = (
+                start_coord_array,
+                end_coord_array,
+                strand_array,
+            )
+        official_to_coord[official_name] = _collapse(
+            chr_code, start_coord_array, end_coord_array, strand_array
+        )
 
-            official_to_coord[official_name] = (
-                new_chr_no,
-                new_start_coord,
-                new_end_coord,
-                new_strand,
+    displaced_to_coord = {
+        gene: _collapse(gene[1], *gene_rows)
+        for gene, gene_rows in displaced_rows.items()
+    }
+
+    # Only names listed for other genes than the one they resolve to are kept
+    ambiguous_names: Dict[str, List[GeneId]] = {}
+    for name, genes in name_to_genes.items():
+        official_name = name_to_official[name]
+        coord = official_to_coord.get(official_name)
+        resolved = None if coord is None else (official_name, int(coord[0]))
+        if list(genes) != [resolved]:
+            ambiguous_names[name] = sorted(
+                genes, key=lambda gene: gene != resolved
             )
 
-            line = bio_mart_file.readline()
+    return ParsedBioMart(
+        name_to_official,
+        official_to_coord,
+        loci,
+        ambiguous_names,
+        displaced_to_coord,
+    )
 
-    for official_name, coords in official_to_coord.items():
-        chr_no, start_coord_array, end_coord_array, strand_array = coords
 
-        start_coord = min(start_coord_array)
-        end_coord = max(end_coord_array)
+def _collapse(
+    chr_code: int,
+    start_coord_array: List[int],
+    end_coord_array: List[int],
+    strand_array: List[str],
+) -> Tuple:
+    """
+    Collapses the rows of a gene into a single location spanning them all
 
-        if not (
-            all([c == "1" for c in strand_array])
-            or all([c == "-1" for c in strand_array])
-        ):
-            strand = "+/-"
+    """
 
-        else:
-            strand = "+" if strand_array[0] == "1" else "-"
+    start_coord = min(start_coord_array)
+    end_coord = max(end_coord_array)
 
-        official_to_coord[official_name] = (
-            chr_no,
-            start_coord,
-            end_coord,
-            strand,
-        )
+    if not (
+        all([c == "1" for c in strand_array])
+        or all([c == "-1" for c in strand_array])
+    ):
+        strand = "+/-"
 
-    return name_to_official, official_to_coord
+    else:
+        strand = "+" if strand_array[0] == "1" else "-"
+
+    return (
+        CHROMOSOMES[chr_code],
+        start_coord,
+        end_coord,
+        strand,
+    )
 
 
 def is_int(in_obj):
@@ -327,28 +1213,13 @@ def is_int(in_obj):
 
 def main():
     """
-    Parses command line gene argument and prints result on stdout
+    Entry point of the hgfind command, see hgfind.cli.main
 
     """
-    parser = argparse.ArgumentParser(
-        description="Get the human genome (hg38) coordinates of a gene",
-    )
-    parser.add_argument("gene", help="The name of a gene")
-    args = parser.parse_args()
+    # Imported here, as the command line interface imports this module
+    from .cli import main as cli_main
 
-    test_gene = args.gene
-    try:
-        result = hgfind(test_gene)
-    except WrongGeneName:
-        print(f"{test_gene} not recognized as a gene")
-        sys.exit(1)
-
-    test_gene_name = result["official_name"]
-    chr_n = result["chr_n"]
-    start = result["start_coord"]
-    end = result["end_coord"]
-    strand = result["strand"]
-    print(f"{test_gene_name} => {chr_n}:{start}-{end} ({strand})")
+    cli_main()
 
 
 if __name__ == "__main__":
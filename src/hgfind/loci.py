@@ -0,0 +1,220 @@
+"""
+Every locus of every official gene.
+
+The dictionaries behind hgfind() describe each official gene by one span,
+from the smallest start to the largest end coordinate of the BioMart rows
+listing it. Genes listed at several loci (e.g. genes present in several
+copies) keep every distinct locus here instead, in compact typed arrays: the
+loci of the gene in GeneTable row i are entries offsets[i] up to
+offsets[i + 1] of the start, end and strand columns, sorted by start.
+
+Loci are cached separately from the lookup dictionaries, and only loaded
+when first needed. As the loci are aligned by position, the cache records a
+digest of the order of the official names it was built for, and a cache built
+for another order is never used.
+
+"""
+
+import hashlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .cache import dump_pickle, load_pickle
+from .hgfind import (
+    GENE_INDEX,
+    PATH_TO_BIO_MART,
+    GeneIndex,
+    file_to_index,
+    unrecognized_gene,
+)
+from .table import CODE_TO_STRAND, GeneTable
+
+LOCI_FORMAT_VERSION = 2
+
+
+def order_digest(names: Iterable[str]) -> str:
+    """
+    Returns a digest of a sequence of official gene names, identifying the
+    GeneTable row order that loci are aligned with
+
+    """
+    sha = hashlib.sha256()
+    for name in names:
+        sha.update(name.encode())
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+class GeneLoci:
+    """
+    The distinct loci of the official genes of a GeneTable, as parallel typed
+    arrays grouped by the GeneTable row of their gene
+
+    """
+
+    def __init__(
+        self,
+        offsets: array,
+        start: array,
+        end: array,
+        strand: array,
+        names_digest: str,
+    ):
+        self.offsets = offsets
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.names_digest = names_digest
+
+    @classmethod
+    def from_rows(
+        cls, table: GeneTable, rows: Dict[str, Tuple[List, List, List]]
+    ) -> "GeneLoci":
+        """
+        Collects the distinct loci of every gene in the table.
+
+        :param table: the genes to collect the loci of
+        :param rows: official name -> (start coordinates, end coordinates,
+            BioMart strands) of its rows, as returned by file_to_index
+        :returns: the loci, grouped by GeneTable row
+
+        """
+        offsets = array("q", [0])
+        start = array("q")
+        end = array("q")
+        strand = array("b")
+        for name in table.names:
+            for locus in sorted(set(zip(*rows[name]))):
+                start.append(locus[0])
+                end.append(locus[1])
+                # BioMart strands are "1" and "-1", the strand codes as text
+                strand.append(int(locus[2]))
+            offsets.append(len(start))
+        return cls(offsets, start, end, strand, order_digest(table.names))
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def n_genes(self) -> int:
+        """
+        The number of genes the loci belong to
+
+        """
+        return len(self.offsets) - 1
+
+    def loci_of(self, row: int) -> range:
+        """
+        Returns the positions of the loci of the gene in the given GeneTable
+        row, sorted by start
+
+        """
+        return range(self.offsets[row], self.offsets[row + 1])
+
+    def overlaps(self, row: int, start: int, end: int) -> bool:
+        """
+        Checks whether any locus of the gene in the given GeneTable row
+        overlaps [start, end] (1-based, inclusive)
+
+        """
+        return any(
+            self.start[i] <= end and self.end[i] >= start
+            for i in self.loci_of(row)
+        )
+
+
+def _pickled(loci: GeneLoci) -> Tuple:
+    return loci.offsets, loci.start, loci.end, loci.strand, loci.names_digest
+
+
+def dump_loci(path: Union[str, Path], loci: GeneLoci):
+    """
+    Atomically writes the loci to a pickle file that load_loci can read back
+
+    """
+    dump_pickle(path, _pickled(loci))
+
+
+def load_loci(
+    path: Union[str, Path] = PATH_TO_BIO_MART,
+    processes: Optional[int] = 1,
+    names_digest: Optional[str] = None,
+) -> GeneLoci:
+    """
+    Loads the loci of the official genes, from a content addressed cache if
+    possible, and by parsing (and caching) the BioMart file otherwise.
+
+    :param path: path to BioMart file specifying gene coordinates
+    :param processes: number of processes to parse the file with if needed,
+        see file_to_dicts
+    :param names_digest: if given, the order_digest of the official names
+        the loci must be aligned with; a cache built for another order is
+        rebuilt
+    :returns: the loci of the genes of the GeneTable built from the file
+
+    """
+
+    def build() -> Tuple:
+        parsed = file_to_index(path, processes)
+        loci = GeneLoci.from_rows(
+            GeneTable(parsed.official_to_coord), parsed.loci
+        )
+        return _pickled(loci)
+
+    def is_valid(contents: Any) -> bool:
+        return (
+            isinstance(contents, tuple)
+            and len(contents) == 5
+            and names_digest in (None, contents[-1])
+        )
+
+    return GeneLoci(
+        *load_pickle(path, "loci", LOCI_FORMAT_VERSION, build, is_valid)
+    )
+
+
+def index_loci(index: GeneIndex) -> GeneLoci:
+    """
+    Returns the loci of the genes in a gene index, aligned with the rows of
+    its GeneTable, loading them on first use
+
+    """
+
+    def build(index: GeneIndex) -> GeneLoci:
+        names_digest = order_digest(index.table.names)
+        loci = load_loci(index.path, index.processes, names_digest)
+        if loci.names_digest != names_digest:
+            raise ValueError("gene loci do not match the gene index")
+        return loci
+
+    return index.derived("loci", build)
+
+
+def hgfind_loci(gene: str) -> List[Dict]:
+    """
+    Given a gene name from the human genome, returns every distinct locus
+    of the gene on hg38. The location hgfind() returns spans all of them.
+
+    :param gene: a string representing the name of a human gene
+    :returns: a list of dictionaries with the same keys as the dictionary
+      hgfind() returns, one per locus, sorted by start coordinate
+    :raises WrongGeneName: if the gene is not recognized
+
+    """
+
+    result = GENE_INDEX.lookup(gene)
+    if result is None:
+        raise unrecognized_gene(gene)
+
+    loci = index_loci(GENE_INDEX)
+    row = GENE_INDEX.table.row_of[result["official_name"]]
+    return [
+        dict(
+            result,
+            start_coord=loci.start[i],
+            end_coord=loci.end[i],
+            strand=CODE_TO_STRAND[loci.strand[i]],
+        )
+        for i in loci.loci_of(row)
+    ]
@@ -0,0 +1,360 @@
+"""
+Nearest gene queries: finding the genes closest to a position or region.
+
+Distances are signed relative to the gene's strand, following the usual
+upstream/downstream convention: a negative distance means the query lies
+upstream of the gene (before its 5' end), a positive one that it lies
+downstream, and 0 that it overlaps the gene. Genes transcribed from both
+strands ("+/-") are oriented like genes on the forward strand.
+
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .columnar import require_numpy
+from .hgfind import GENE_INDEX, Chromosome, GeneIndex
+from .regions import overlapping_rows, parse_region, row_result
+from .table import GeneTable
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Positions are combined with chromosome codes into one sortable integer key
+_KEY_SHIFT = 32
+
+
+class _ChromosomeEnds:
+    """
+    The rows of one chromosome in order of their end coordinate
+
+    """
+
+    def __init__(self, table: GeneTable, rows: range):
+        self.rows = sorted(rows, key=lambda row: table.end[row])
+        self.ends = array("q", (table.end[row] for row in self.rows))
+
+
+def _ends_by_chromosome(index: GeneIndex) -> Dict[int, _ChromosomeEnds]:
+    table = index.table
+    return {
+        chr_code: _ChromosomeEnds(table, table.rows_on(chr_code))
+        for chr_code in table.chrom_rows
+    }
+
+
+def signed_distance(table: GeneTable, row: int, start: int, end: int) -> int:
+    """
+    Computes the strand-aware distance from the region [start, end] to the
+    gene in the given GeneTable row (see the module documentation)
+
+    """
+    if table.end[row] < start:
+        distance = start - table.end[row]
+    elif table.start[row] > end:
+        distance = end - table.start[row]
+    else:
+        return 0
+    return -distance if table.strand[row] == -1 else distance
+
+
+def nearest_rows(
+    chr_n: Union[Chromosome, int, str], start: int, end: int, k: int = 1
+) -> List[Tuple[int, int]]:
+    """
+    Finds the k genes nearest to a region of a chromosome, using binary
+    searches over the genes sorted by start and by end coordinate.
+
+    :param chr_n: the chromosome, as a Chromosome, code or name
+    :param start: start of the region (1-based, inclusive)
+    :param end: end of the region (1-based, inclusive)
+    :param k: the number of genes to find
+    :returns: up to k (GeneTable row, signed distance) pairs, nearest first;
+        genes at equal distances are in genome order
+
+    """
+    if isinstance(chr_n, str):
+        chr_n = Chromosome(chr_n)
+    chr_code = int(chr_n)
+
+    table = GENE_INDEX.table
+    by_end = GENE_INDEX.derived("ends", _ends_by_chromosome).get(chr_code)
+    if by_end is None or k <= 0:
+        return []
+
+    found = overlapping_rows(chr_code, start, end)[:k]
+
+    # Walk outwards from the region on both sides, always taking the closer
+    # of the next gene to the right (by start) and to the left (by end)
+    first, stop = table.chrom_rows[chr_code]
+    right = bisect_right(table.start, end, first, stop)
+    left = bisect_left(by_end.ends, start) - 1
+
+    inf = float("inf")
+    while len(found) < k and (right < stop or left >= 0):
+        right_distance = table.start[right] - end if right < stop else inf
+        left_distance = start - by_end.ends[left] if left >= 0 else inf
+        if right_distance <= left_distance:
+            found.append(right)
+            right += 1
+        else:
+            found.append(by_end.rows[left])
+            left -= 1
+
+    return [(row, signed_distance(table, row, start, end)) for row in found]
+
+
+def hgfind_nearest(region: str, k: int = 1) -> List[Dict]:
+    """
+    Given a position or region of the human genome such as "4:82352498",
+    returns the k genes nearest to it on hg38.
+
+    :param region: a position or region as accepted by parse_region
+    :param k: the number of genes to return
+    :returns: a list of up to k dictionaries, nearest first, with the same
+      keys as the dictionaries hgfind() returns plus 'distance', the signed
+      distance from the region to the gene (see the module documentation)
+    :raises ValueError: if the region cannot be parsed
+
+    """
+    chr_n, start, end = parse_region(region)
+    table = GENE_INDEX.table
+    results = []
+    for row, distance in nearest_rows(chr_n, start, end, k):
+        result = row_result(table, row)
+        result["distance"] = distance
+        results.append(result)
+    return results
+
+
+class NearestArrays(NamedTuple):
+    """
+    Parallel arrays describing the nearest gene to each of a batch of
+    positions or regions. Element i of every array describes the i-th query;
+    when k nearest genes are requested, row i holds them nearest first.
+
+    official_index: index into GENE_INDEX.table.names of the nearest gene's
+        official name, or -1 if there are no genes on the chromosome (int64)
+    distance: the signed distance from the query to the gene (int64), see
+        the module documentation; 0 where official_index is -1
+
+    """
+
+    official_index: "np.ndarray"
+    distance: "np.ndarray"
+
+
+def _key_columns(index: GeneIndex):
+    """
+    Converts the GeneTable to NumPy arrays keyed by chromosome and position:
+    the start keys in table order with a running maximum of the end keys,
+    and the end keys in sorted order with the rows they belong to
+
+    """
+    np = require_numpy()
+    table = index.table
+    chrom = np.frombuffer(table.chrom, dtype=np.int8).astype(np.int64)
+    start = np.frombuffer(table.start, dtype=np.int64)
+    end = np.frombuffer(table.end, dtype=np.int64)
+
+    start_key = (chrom << _KEY_SHIFT) + start
+    end_key = (chrom << _KEY_SHIFT) + end
+    running_max = np.maximum.accumulate(end_key)
+    running_argmax = np.arange(len(end_key))
+    running_argmax[1:][running_max[1:] == running_max[:-1]] = -1
+    running_argmax = np.maximum.accumulate(running_argmax)
+
+    by_end = np.argsort(end_key, kind="stable")
+    return (
+        start_key,
+        running_max,
+        running_argmax,
+        end_key[by_end],
+        by_end,
+        chrom,
+        start,
+        end,
+        np.frombuffer(table.strand, dtype=np.int8),
+    )
+
+
+def _previous_longer(index: GeneIndex):
+    """
+    For each GeneTable row, the closest earlier row whose gene ends further
+    along the genome, or -1: the rows in between all end before the row's
+    own end, so a backward search for genes reaching a position can skip them
+
+    """
+    np = require_numpy()
+    table = index.table
+    end_keys = [
+        (chr_code << _KEY_SHIFT) + end
+        for chr_code, end in zip(table.chrom, table.end)
+    ]
+    previous = np.full(len(end_keys), -1, dtype=np.int64)
+    stack = []
+    for row, end_key in enumerate(end_keys):
+        while stack and end_keys[stack[-1]] <= end_key:
+            stack.pop()
+        if stack:
+            previous[row] = stack[-1]
+        stack.append(row)
+    return previous
+
+
+def _k_nearest(k: int, chr_n, start, end, after, before):
+    """
+    Finds the k genes nearest to each query for nearest_arrays, walking
+    outwards from the queries in vectorized steps as nearest_rows does
+
+    :param after: the number of genes starting no later than each query ends
+    :param before: the position in end order of the last gene ending before
+        each query starts
+    :returns: (k-column arrays of GeneTable rows, distances along the
+        genome before orienting them by strand)
+
+    """
+    np = require_numpy()
+    columns = GENE_INDEX.derived("key_columns", _key_columns)
+    _, _, _, _, by_end, chrom, gene_start, gene_end, _ = columns
+    previous_longer = GENE_INDEX.derived("previous_longer", _previous_longer)
+    n_genes = len(by_end)
+    n_queries = len(after)
+    rows = np.full((n_queries, k), -1, dtype=np.int64)
+    genomic = np.zeros((n_queries, k), dtype=np.int64)
+    filled = np.zeros(n_queries, dtype=np.int64)
+
+    # Every gene ending before a query also starts before it, so the genes
+    # overlapping a query are those counted by after but not by before.
+    # Search back from the last gene starting in the query for them.
+    n_overlapping = np.minimum(after - before - 1, k)
+    cursor = after - 1
+    active = np.flatnonzero(n_overlapping > 0)
+    while active.size:
+        candidate = cursor[active]
+        hit = (chrom[candidate] == chr_n[active]) & (
+            gene_end[candidate] >= start[active]
+        )
+        hits = active[hit]
+        rows[hits, filled[hits]] = candidate[hit]
+        filled[hits] += 1
+        cursor[active] = np.where(
+            hit, candidate - 1, previous_longer[candidate]
+        )
+        active = active[filled[active] < n_overlapping[active]]
+
+    # Then take the closer of the next gene to the right (by start) and to
+    # the left (by end) until k genes are found or the chromosome runs out
+    right = after
+    left = before
+    for _ in range(k):
+        right_row = np.minimum(right, n_genes - 1)
+        right_ok = (right < n_genes) & (chrom[right_row] == chr_n)
+        right_distance = np.where(right_ok, gene_start[right_row] - end, -1)
+        left_row = by_end[np.maximum(left, 0)]
+        left_ok = (left >= 0) & (chrom[left_row] == chr_n)
+        left_distance = np.where(left_ok, start - gene_end[left_row], -1)
+
+        take_right = right_ok & (~left_ok | (right_distance <= left_distance))
+        take = (filled < k) & (right_ok | left_ok)
+        taken = np.flatnonzero(take)
+        if not taken.size:
+            break
+        rows[taken, filled[taken]] = np.where(take_right, right, left_row)[
+            taken
+        ]
+        genomic[taken, filled[taken]] = np.where(
+            take_right, -right_distance, left_distance
+        )[taken]
+        filled += take
+        right = right + (take & take_right)
+        left = left - (take & ~take_right)
+
+    return rows, genomic
+
+
+def nearest_arrays(
+    chr_n, start, end=None, k: Optional[int] = None
+) -> NearestArrays:
+    """
+    Finds the nearest gene to each of a batch of positions or regions, with
+    a handful of vectorized binary searches over the whole batch.
+
+    :param chr_n: array of chromosome codes (see hgfind.hgfind.CHROMOSOMES)
+    :param start: array of positions or region starts (1-based)
+    :param end: array of region ends (1-based, inclusive); defaults to start
+    :param k: if given, the number of genes to find for each query
+    :returns: a NearestArrays with one element per query, or with k columns
+        per query if k is given (padded with -1 and 0 where a chromosome has
+        fewer genes). When more genes overlap a query than are reported,
+        which of them are reported is unspecified.
+
+    """
+    np = require_numpy()
+
+    (
+        start_key,
+        running_max,
+        running_argmax,
+        sorted_end_key,
+        by_end,
+        chrom,
+        gene_start,
+        gene_end,
+        gene_strand,
+    ) = GENE_INDEX.derived("key_columns", _key_columns)
+
+    chr_n = np.asarray(chr_n, dtype=np.int64)
+    start = np.asarray(start, dtype=np.int64)
+    end = start if end is None else np.asarray(end, dtype=np.int64)
+    n_genes = len(start_key)
+
+    query_start = (chr_n << _KEY_SHIFT) + start
+    query_end = (chr_n << _KEY_SHIFT) + end
+    after = np.searchsorted(start_key, query_end, side="right")
+    before = np.searchsorted(sorted_end_key, query_start, side="left") - 1
+
+    if k is not None:
+        rows, genomic = _k_nearest(k, chr_n, start, end, after, before)
+        reverse = (rows >= 0) & (gene_strand[np.maximum(rows, 0)] == -1)
+        distance = np.where(reverse, -genomic, genomic)
+        return NearestArrays(official_index=rows, distance=distance)
+
+    # Nearest gene starting after the query
+    right = np.minimum(after, n_genes - 1)
+    right_ok = (after < n_genes) & (chrom[right] == chr_n)
+    right_distance = np.where(right_ok, gene_start[right] - end, np.inf)
+
+    # Nearest gene ending before the query
+    left = by_end[np.maximum(before, 0)]
+    left_ok = (before >= 0) & (chrom[left] == chr_n)
+    left_distance = np.where(left_ok, start - gene_end[left], np.inf)
+
+    # A gene overlapping the query: of the genes starting no later than the
+    # query ends, the one reaching furthest must reach into the query
+    last = np.maximum(after - 1, 0)
+    overlap_ok = (after > 0) & (running_max[last] >= query_start)
+
+    take_right = right_distance <= left_distance
+    genomic = np.where(take_right, -right_distance, left_distance)
+    row = np.where(take_right, right, left)
+
+    found = right_ok | left_ok
+    row = np.where(found, row, -1)
+    genomic = np.where(found, genomic, 0)
+    row = np.where(overlap_ok, running_argmax[last], row)
+    genomic = np.where(overlap_ok, 0, genomic).astype(np.int64)
+
+    reverse = (row >= 0) & (gene_strand[np.maximum(row, 0)] == -1)
+    distance = np.where(reverse, -genomic, genomic)
+
+    return NearestArrays(official_index=row, distance=distance)
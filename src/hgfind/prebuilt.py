@@ -0,0 +1,98 @@
+"""
+Builds the caches that are shipped prebuilt inside the hgfind package, so that
+fresh installs never have to parse the BioMart table. This runs as part of
+building a wheel (see setup.py), but can also be run by hand, e.g. when
+baking a container image:
+
+    python -m hgfind.prebuilt [DIRECTORY]
+
+"""
+
+import argparse
+from pathlib import Path
+from typing import List, Union
+
+from .binindex import FORMAT_VERSION, write_index
+from .cache import PREBUILT_DIR, cache_name
+from .hgfind import (
+    MATCHES_FORMAT_VERSION,
+    PATH_TO_BIO_MART,
+    PICKLE_FORMAT_VERSION,
+    dump_dicts,
+    dump_matches,
+    file_to_index,
+)
+from .loci import LOCI_FORMAT_VERSION, GeneLoci, dump_loci
+from .table import GeneTable
+
+
+def write_prebuilt(
+    directory: Union[str, Path] = PREBUILT_DIR,
+    bio_mart_path: Union[str, Path] = PATH_TO_BIO_MART,
+) -> List[Path]:
+    """
+    Parses the BioMart file once and writes the pickle cache, the gene loci,
+    the ambiguous name index and the binary index under their content
+    addressed names.
+
+    :param directory: where to write the caches; defaults to the package
+    :param bio_mart_path: the BioMart file to build the caches from
+    :returns: the paths of the written caches
+
+    """
+
+    parsed = file_to_index(bio_mart_path)
+    name_to_official, official_to_coord = (
+        parsed.name_to_official,
+        parsed.official_to_coord,
+    )
+
+    directory = Path(directory)
+    path_to_pickle = directory / cache_name(
+        bio_mart_path, "pickle", PICKLE_FORMAT_VERSION, ".pickle"
+    )
+    path_to_loci = directory / cache_name(
+        bio_mart_path, "loci", LOCI_FORMAT_VERSION, ".pickle"
+    )
+    path_to_matches = directory / cache_name(
+        bio_mart_path, "matches", MATCHES_FORMAT_VERSION, ".pickle"
+    )
+    path_to_index = directory / cache_name(
+        bio_mart_path, "binary", FORMAT_VERSION, ".idx"
+    )
+
+    dump_dicts(path_to_pickle, name_to_official, official_to_coord)
+    dump_loci(
+        path_to_loci,
+        GeneLoci.from_rows(GeneTable(official_to_coord), parsed.loci),
+    )
+    dump_matches(
+        path_to_matches, parsed.name_to_genes, parsed.displaced_to_coord
+    )
+    write_index(path_to_index, name_to_official, official_to_coord)
+
+    return [path_to_pickle, path_to_loci, path_to_matches, path_to_index]
+
+
+def main():
+    """
+    Writes the prebuilt caches into the directory given on the command line
+
+    """
+    parser = argparse.ArgumentParser(
+        description="Prebuild the hgfind caches shipped with the package",
+    )
+    parser.add_argument(
+        "directory",
+        nargs="?",
+        default=PREBUILT_DIR,
+        help="Where to write the caches (default: the hgfind package)",
+    )
+    args = parser.parse_args()
+
+    for path in write_prebuilt(args.directory):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
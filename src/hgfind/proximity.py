@@ -0,0 +1,99 @@
+"""
+Proximity joins between sets of genes: finding the pairs of genes from two
+lists that overlap or lie near each other.
+
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from .annotate import GeneSweep
+from .hgfind import GENE_INDEX, hgfind_many
+from .table import GeneTable
+
+
+class GenePair(NamedTuple):
+    """
+    A pair of genes lying near each other
+
+    gene_a: the name of the gene from the first list, as given
+    gene_b: the name of the gene from the second list, as given
+    distance: the number of bases from the end of one gene to the start of
+        the other, or 0 if they overlap
+
+    """
+
+    gene_a: str
+    gene_b: str
+    distance: int
+
+
+def _by_official_name(results: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """
+    Groups the names given to hgfind_many by the official name they resolved
+    to, in order
+
+    """
+    names: Dict[str, List[str]] = {}
+    for gene, result in results.items():
+        names.setdefault(result["official_name"], []).append(gene)
+    return names
+
+
+def proximity_join(
+    genes_a: Iterable[str],
+    genes_b: Iterable[str],
+    max_distance: int = 0,
+    on_missing: str = "collect",
+) -> Tuple[List[GenePair], List[str]]:
+    """
+    Finds all pairs of a gene from one list and a gene from another that
+    overlap or lie within max_distance bases of each other.
+
+    Both lists are sorted into genome order and joined in a single sweep
+    per chromosome, so the cost grows with the length of the lists and the
+    number of pairs found rather than with the product of the lengths.
+
+    :param genes_a: the first list of gene names (case insensitive)
+    :param genes_b: the second list of gene names (case insensitive)
+    :param max_distance: the largest distance (as in GenePair) to report
+    :param on_missing: what to do with unrecognized names, as in hgfind_many
+    :returns: a tuple of
+        (the pairs found, ordered by the position of gene_a and then of
+         gene_b in the genome,
+         the unrecognized names of both lists, as given, in order of first
+         appearance)
+    :raises ValueError: if max_distance is negative
+
+    """
+
+    if max_distance < 0:
+        raise ValueError(f"max_distance must not be negative: {max_distance}")
+
+    results_a, missing = hgfind_many(genes_a, on_missing)
+    results_b, missing_b = hgfind_many(genes_b, on_missing)
+    seen_missing = set(missing)
+    missing += [gene for gene in missing_b if gene not in seen_missing]
+
+    names_a = _by_official_name(results_a)
+    names_b = _by_official_name(results_b)
+
+    official_to_coord = GENE_INDEX.official_to_coord
+    table_a = GeneTable({name: official_to_coord[name] for name in names_a})
+    table_b = GeneTable({name: official_to_coord[name] for name in names_b})
+    sweep = GeneSweep(table_b)
+
+    pairs = []
+    for row_a, official_a in enumerate(table_a.names):
+        start, end = table_a.start[row_a], table_a.end[row_a]
+        rows_b = sweep.overlapping(
+            table_a.chrom[row_a], start - max_distance, end + max_distance
+        )
+        for row_b in rows_b:
+            distance = max(
+                0, table_b.start[row_b] - end, start - table_b.end[row_b]
+            )
+            for gene_a in names_a[official_a]:
+                for gene_b in names_b[table_b.names[row_b]]:
+                    pairs.append(GenePair(gene_a, gene_b, distance))
+
+    return pairs, missing
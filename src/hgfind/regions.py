@@ -0,0 +1,253 @@
+"""
+Queries by genomic region: finding the genes that overlap a region, and
+listing the genes of a chromosome in genome order.
+
+Overlap queries are answered by an IntervalIndex per chromosome, an implicit
+interval tree laid over the genes' start-sorted coordinates (the "cgranges"
+layout), which finds the k genes overlapping a region in O(log n + k).
+
+"""
+
+import re
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from .hgfind import CHROMOSOMES, GENE_INDEX, Chromosome, GeneIndex
+from .loci import index_loci
+from .table import CODE_TO_STRAND, GeneTable
+
+_REGION = re.compile(
+    r"^\s*(?:chr)?(?P<chr>[0-9]{1,2}|[XYM]|MT)\s*:\s*"
+    r"(?P<start>[0-9,]+)(?:\s*-\s*(?P<end>[0-9,]+))?\s*$",
+    re.IGNORECASE,
+)
+
+
+def parse_region(region: str) -> Tuple[Chromosome, int, int]:
+    """
+    Parses a region such as "4:82352498-82374503", as printed by the command
+    line interface. A "chr" prefix, thousands separators and single positions
+    (e.g. "chrX:1,000") are accepted as well.
+
+    :param region: the region as a string
+    :returns: the chromosome, start and end (1-based, inclusive) of the region
+    :raises ValueError: if the region cannot be parsed
+
+    """
+
+    match = _REGION.match(region)
+    if match is None:
+        raise ValueError(f"expected a region such as 4:1000-2000: {region}")
+
+    chr_n = Chromosome(match.group("chr"))
+    start = int(match.group("start").replace(",", ""))
+    end = match.group("end")
+    end = start if end is None else int(end.replace(",", ""))
+
+    if start > end:
+        raise ValueError(f"region starts after it ends: {region}")
+
+    return chr_n, start, end
+
+
+class IntervalIndex:
+    """
+    An implicit interval tree over a run of GeneTable rows sorted by start.
+    Node i of the tree is the i-th interval; max_end[i] holds the largest end
+    coordinate in the subtree rooted at i.
+
+    Intervals are stored half-open, i.e. [start, end + 1).
+
+    """
+
+    def __init__(self, table: GeneTable, rows: range):
+        self.first_row = rows.start
+        self.start = table.start[rows.start : rows.stop]
+        self.end = array(
+            "q", (end + 1 for end in table.end[rows.start : rows.stop])
+        )
+        self.max_end = array("q", self.end)
+        self.root_level = self._index()
+
+    def _index(self) -> int:
+        """
+        Computes max_end for every internal node, bottom up, and returns the
+        level of the root
+
+        """
+        n = len(self.start)
+        if n == 0:
+            return -1
+
+        max_end = self.max_end
+        last_i = (n - 1) & ~1
+        last = max_end[last_i]
+
+        level = 1
+        while 1 << level <= n:
+            x = 1 << (level - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                right = max_end[i + x] if i + x < n else last
+                max_end[i] = max(max_end[i], max_end[i - x], right)
+            # last_i moves to its parent, which is x away on either side
+            last_i = last_i - x if last_i >> level & 1 else last_i + x
+            if last_i < n and max_end[last_i] > last:
+                last = max_end[last_i]
+            level += 1
+
+        return level - 1
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """
+        Finds the rows whose intervals overlap [start, end] (1-based,
+        inclusive).
+
+        :returns: the overlapping GeneTable rows, sorted by start
+
+        """
+        if self.root_level < 0:
+            return []
+
+        n = len(self.start)
+        starts, ends, max_end = self.start, self.end, self.max_end
+        query_end = end + 1
+        found = []
+
+        # (node, level, whether the left subtree has been visited)
+        stack = [((1 << self.root_level) - 1, self.root_level, False)]
+        while stack:
+            x, level, left_done = stack.pop()
+            if level <= 3:
+                # Small subtree: scanning it linearly is cheapest
+                i0 = x >> level << level
+                i1 = min(i0 + (1 << (level + 1)) - 1, n)
+                for i in range(i0, i1):
+                    if starts[i] >= query_end:
+                        break
+                    if start < ends[i]:
+                        found.append(i)
+            elif not left_done:
+                stack.append((x, level, True))
+                y = x - (1 << (level - 1))
+                if y >= n or max_end[y] > start:
+                    stack.append((y, level - 1, False))
+            elif x < n and starts[x] < query_end:
+                if start < ends[x]:
+                    found.append(x)
+                stack.append((x + (1 << (level - 1)), level - 1, False))
+
+        return [self.first_row + i for i in found]
+
+
+def _interval_indexes(index: GeneIndex) -> Dict[int, IntervalIndex]:
+    table = index.table
+    return {
+        chr_code: IntervalIndex(table, table.rows_on(chr_code))
+        for chr_code in table.chrom_rows
+    }
+
+
+def row_result(table: GeneTable, row: int) -> Dict:
+    """
+    Describes a GeneTable row with the same dictionary hgfind() returns
+
+    """
+    return {
+        "chr_n": CHROMOSOMES[table.chrom[row]],
+        "start_coord": table.start[row],
+        "end_coord": table.end[row],
+        "strand": CODE_TO_STRAND[table.strand[row]],
+        "official_name": table.names[row],
+    }
+
+
+def overlapping_rows(
+    chr_n: Union[Chromosome, int, str],
+    start: int,
+    end: int,
+    by_locus: bool = False,
+) -> List[int]:
+    """
+    Finds the genes overlapping a region of a chromosome.
+
+    :param chr_n: the chromosome, as a Chromosome, code or name
+    :param start: start of the region (1-based, inclusive)
+    :param end: end of the region (1-based, inclusive)
+    :param by_locus: only find genes with a locus overlapping the region,
+        rather than genes whose span (see hgfind.loci) overlaps it
+    :returns: the GeneTable rows of GENE_INDEX.table overlapping the region,
+        in genome order
+
+    """
+    if isinstance(chr_n, str):
+        chr_n = Chromosome(chr_n)
+    indexes = GENE_INDEX.derived("intervals", _interval_indexes)
+    interval_index = indexes.get(int(chr_n))
+    if interval_index is None:
+        return []
+    rows = interval_index.overlapping(start, end)
+    if by_locus:
+        loci = index_loci(GENE_INDEX)
+        rows = [row for row in rows if loci.overlaps(row, start, end)]
+    return rows
+
+
+def hgfind_region(region: str, by_locus: bool = False) -> List[Dict]:
+    """
+    Given a region of the human genome such as "4:82352498-82374503", returns
+    the genes overlapping it on hg38.
+
+    :param region: a region as accepted by parse_region
+    :param by_locus: only return genes with a locus overlapping the region,
+      see overlapping_rows
+    :returns: a list with one dictionary per overlapping gene, in genome
+      order, with the same keys as the dictionaries hgfind() returns
+    :raises ValueError: if the region cannot be parsed
+
+    """
+    chr_n, start, end = parse_region(region)
+    table = GENE_INDEX.table
+    return [
+        row_result(table, row)
+        for row in overlapping_rows(chr_n, start, end, by_locus)
+    ]
+
+
+def iter_genes() -> Iterator[Dict]:
+    """
+    Iterates over all official genes in genome order, i.e. sorted by
+    chromosome and start coordinate.
+
+    :returns: an iterator of dictionaries with the same keys as the
+      dictionaries hgfind() returns
+
+    """
+    table = GENE_INDEX.table
+    for row in range(len(table)):
+        yield row_result(table, row)
+
+
+def genes_on(
+    chr_n: Union[Chromosome, int, str],
+    start: Optional[int] = None,
+    end: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Lists the genes on a chromosome in genome order, optionally only those
+    starting within [start, end]. As every gene starts in exactly one of a
+    series of adjacent tiles, this suits splitting chromosomes into tiles; to
+    find the genes overlapping a region instead, use hgfind_region.
+
+    :param chr_n: the chromosome, as a Chromosome, code or name
+    :param start: the first start coordinate to include (1-based)
+    :param end: the last start coordinate to include (1-based)
+    :returns: a list of dictionaries with the same keys as the dictionaries
+      hgfind() returns
+
+    """
+    if isinstance(chr_n, str):
+        chr_n = Chromosome(chr_n)
+    table = GENE_INDEX.table
+    return [
+        row_result(table, row) for row in table.rows_on(int(chr_n), start, end)
+    ]
@@ -0,0 +1,302 @@
+"""
+Searches over the names of the genes rather than lookups of a single name:
+completion of name prefixes, and glob and regular expression searches.
+
+Names are searched through NameKeys: every gene name upper-cased and sorted,
+so that the names starting with a prefix form one contiguous range, found by
+bisection without scanning the other names. Patterns are only matched against
+the names in the range of their literal prefix (if any) that contain every
+literal substring the pattern requires.
+
+"""
+
+import fnmatch
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Tuple
+
+from .hgfind import GENE_INDEX, GeneIndex
+from .regions import row_result
+
+
+class NameKeys:
+    """
+    Gene names as a sorted array of upper-cased keys, each with the name as
+    listed in BioMart and the GeneTable row of the gene it names
+
+    """
+
+    def __init__(self, names: List[Tuple[str, int]]):
+        entries = sorted((name.upper(), name, row) for name, row in names)
+        self.keys = [key for key, _, _ in entries]
+        self.names = [name for _, name, _ in entries]
+        self.rows = array("q", [row for _, _, row in entries])
+        # The keys joined into one text, in which substrings are found at C
+        # speed, and the offset of every key in it
+        self.text = "\n".join(self.keys)
+        self.offsets = array("q")
+        offset = 0
+        for key in self.keys:
+            self.offsets.append(offset)
+            offset += len(key) + 1
+
+    def __len__(self):
+        return len(self.keys)
+
+    def prefix_range(self, prefix: str) -> range:
+        """
+        Finds the keys starting with an (upper case) prefix
+
+        :param prefix: the prefix of the keys
+        :returns: the positions of the keys starting with the prefix
+
+        """
+        first = bisect_left(self.keys, prefix)
+        if not prefix:
+            return range(first, len(self.keys))
+        # The first key past the range is the first not below the prefix
+        # with its last character incremented
+        stop = bisect_left(
+            self.keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), first
+        )
+        return range(first, stop)
+
+    def containing(self, literal: str) -> List[int]:
+        """
+        Finds the keys containing an (upper case) literal substring
+
+        :param literal: the substring to find
+        :returns: the positions of the keys containing it, in order
+
+        """
+        if not literal:
+            return list(range(len(self.keys)))
+        # A substring spanning keys is not in any of them
+        if "\n" in literal:
+            return []
+
+        text, offsets = self.text, self.offsets
+        positions: List[int] = []
+        found = text.find(literal)
+        while found != -1:
+            position = bisect_right(offsets, found) - 1
+            positions.append(position)
+            # Continue after the key, which need only be found once
+            if position + 1 == len(offsets):
+                break
+            found = text.find(literal, offsets[position + 1])
+        return positions
+
+
+def _name_keys(index: GeneIndex) -> Tuple[NameKeys, NameKeys]:
+    """
+    Builds the NameKeys of the official names and of the synonyms of the
+    genes in an index
+
+    """
+    row_of = index.table.row_of
+    # BioMart lists some genes without a name
+    officials = [(name, row) for name, row in row_of.items() if name]
+    synonyms = [
+        (name, row_of[official_name])
+        for name, official_name in index.name_to_official.items()
+        if official_name in row_of and name != official_name
+    ]
+    return NameKeys(officials), NameKeys(synonyms)
+
+
+def hgfind_complete(prefix: str, k: int = 10) -> List[Dict]:
+    """
+    Completes a prefix of a gene name, e.g. as typed into a gene picker.
+
+    Genes whose official name starts with the prefix come first, followed by
+    genes with a synonym starting with it, each in alphabetical order of the
+    matching name; an exact match therefore comes first. Only the ranges of
+    matching names are visited, so completions take microseconds however
+    many names there are.
+
+    :param prefix: the start of a gene name (case insensitive)
+    :param k: the largest number of genes to return
+    :returns: a list of at most k dictionaries with the same keys as the
+      dictionary hgfind() returns, plus 'name': the official name or synonym
+      that starts with the prefix
+
+    """
+
+    prefix = prefix.strip().upper()
+    table = GENE_INDEX.table
+    results: List[Dict] = []
+    seen = set()
+    if k <= 0:
+        return results
+
+    for name_keys in GENE_INDEX.derived("name_keys", _name_keys):
+        for i in name_keys.prefix_range(prefix):
+            row = name_keys.rows[i]
+            if row in seen:
+                continue
+            seen.add(row)
+            results.append(
+                dict(row_result(table, row), name=name_keys.names[i])
+            )
+            if len(results) == k:
+                return results
+
+    return results
+
+
+# Characters with a special meaning in regular expressions
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+# An escape sequence, whose characters are read as one unit: numeric escapes
+# take several characters, and backslashes before other letters and digits
+# stand for something else than the character
+_REGEX_ESCAPE = re.compile(
+    r"\\(?:x[0-9A-Fa-f]{2}|u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|N\{[^}]*\}"
+    r"|0[0-7]{0,2}|[1-7][0-7]{2}|\d{1,2}|.)",
+    re.DOTALL,
+)
+
+
+def _glob_literals(pattern: str) -> Tuple[str, List[str]]:
+    """
+    Finds the literal prefix of a glob pattern and the literal substrings
+    every match contains. Bracket expressions are left out, so both are
+    conservative.
+
+    """
+    prefix = re.split(r"[*?[]", pattern, 1)[0]
+    literals = [
+        segment
+        for segment in re.split(r"[*?]", pattern)
+        if segment and "[" not in segment and "]" not in segment
+    ]
+    return prefix, literals
+
+
+def _set_end(pattern: str, start: int) -> int:
+    """
+    Finds the end of the set opened by the "[" at position start of a
+    regular expression, returning the position past its closing "]", or -1
+    if it is not closed. A "]" right after the opening "[" or "[^" is a
+    member of the set, as are escaped characters.
+
+    """
+    i = start + 1
+    if pattern.startswith("^", i):
+        i += 1
+    if pattern.startswith("]", i):
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+        elif pattern[i] == "]":
+            return i + 1
+        else:
+            i += 1
+    return -1
+
+
+def _regex_literals(pattern: str) -> Tuple[str, List[str]]:
+    """
+    Finds the literal prefix of a regular expression, if it is anchored with
+    "^", and the literal substrings every match contains. Only runs of plain
+    and escaped punctuation characters before any alternation or group are
+    taken into account, so both are conservative.
+
+    """
+    if "|" in pattern or re.compile(pattern).flags & re.VERBOSE:
+        return "", []
+
+    anchored = pattern.startswith("^")
+    runs = []
+    run = ""
+    i = 1 if anchored else 0
+    while i < len(pattern) and pattern[i] != "(":
+        char = pattern[i]
+        if char not in _REGEX_SPECIAL:
+            run += char
+            i += 1
+            continue
+
+        if char == "\\":
+            escape = _REGEX_ESCAPE.match(pattern, i).group()
+            i += len(escape)
+            if len(escape) == 2 and not escape[1].isalnum():
+                run += escape[1]
+                continue
+        elif char in "*?{":
+            # The character before an optional repeat may not occur
+            run = run[:-1]
+        runs.append(run)
+        run = ""
+
+        if char == "{":
+            i = pattern.find("}", i) + 1
+        elif char == "[":
+            i = _set_end(pattern, i)
+        elif char != "\\":
+            i += 1
+        if i <= 0:
+            break
+    else:
+        runs.append(run)
+
+    literals = [run for run in runs if run]
+    prefix = runs[0] if anchored and runs else ""
+    return prefix, literals
+
+
+def hgfind_search(
+    pattern: str, regex: bool = False, synonyms: bool = False
+) -> List[Dict]:
+    """
+    Finds the genes with a name matching a glob pattern, such as "HNRNP*",
+    or a regular expression, e.g. to pull out a whole gene family.
+
+    Only names in the range of the pattern's literal prefix, and containing
+    the literal substrings it requires, are matched against the pattern, so
+    anchored patterns such as "HNRNP*" or "^SLC2[0-9]A" only look at the
+    names they could match.
+
+    :param pattern: a glob pattern matching whole names, or with regex set,
+        a regular expression searched for in the names (anchor it with "^"
+        and "$" to match whole names); case insensitive either way
+    :param regex: whether the pattern is a regular expression
+    :param synonyms: whether to match synonyms as well as official names
+    :returns: a list of dictionaries with the same keys as the dictionary
+      hgfind() returns, plus 'name': the official name if it matches, and
+      the first matching synonym in alphabetical order otherwise; one per
+      gene, in genome order
+    :raises re.error: if the pattern is not a valid regular expression
+
+    """
+
+    if regex:
+        search = re.compile(pattern, re.IGNORECASE).search
+        prefix, literals = _regex_literals(pattern)
+    else:
+        pattern = pattern.upper()
+        search = re.compile(fnmatch.translate(pattern)).match
+        prefix, literals = _glob_literals(pattern)
+    prefix = prefix.upper()
+    literals = [literal.upper() for literal in literals]
+
+    officials, other_names = GENE_INDEX.derived("name_keys", _name_keys)
+    found: Dict[int, str] = {}
+    for name_keys in (officials, other_names) if synonyms else (officials,):
+        keys = name_keys.keys
+        if prefix or not literals:
+            candidates = name_keys.prefix_range(prefix)
+        else:
+            candidates = name_keys.containing(max(literals, key=len))
+        for i in candidates:
+            key = keys[i]
+            if all(literal in key for literal in literals) and search(key):
+                found.setdefault(name_keys.rows[i], name_keys.names[i])
+
+    table = GENE_INDEX.table
+    return [
+        dict(row_result(table, row), name=name)
+        for row, name in sorted(found.items())
+    ]
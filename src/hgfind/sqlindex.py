@@ -0,0 +1,261 @@
+"""
+SQLite backed gene index, for serving lookups from many processes at once.
+
+The database holds a loci table with one row per official gene and a names
+table mapping every key that gene names resolve through (see
+hgfind.resolution_keys) to its locus, so that names resolve exactly as
+hgfind() resolves them. Each process opens the database read-only and queries
+it through indexed lookups instead of holding its own copy of the lookup
+dictionaries in memory. A small Bloom filter of the keys, stored in the
+name_filter table and read once on opening, rejects most unknown names
+without a query.
+
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from .bloom import BloomFilter
+from .cache import atomic_output, build_lock, cache_path, scratch_path
+from .hgfind import (
+    CHROMOSOMES,
+    PATH_TO_BIO_MART,
+    file_to_dicts,
+    query_keys,
+    resolution_keys,
+)
+
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE loci (
+    id INTEGER PRIMARY KEY,
+    official_name TEXT NOT NULL,
+    chr INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    end INTEGER NOT NULL,
+    strand TEXT NOT NULL
+);
+CREATE TABLE names (
+    key TEXT PRIMARY KEY,
+    locus_id INTEGER NOT NULL REFERENCES loci (id)
+) WITHOUT ROWID;
+CREATE INDEX loci_position ON loci (chr, start);
+CREATE TABLE name_filter (
+    n_hashes INTEGER NOT NULL,
+    bits BLOB NOT NULL
+);
+"""
+
+_LOOKUP = """
+SELECT loci.chr, loci.start, loci.end, loci.strand, loci.official_name
+FROM names JOIN loci ON loci.id = names.locus_id
+WHERE names.key = ?
+"""
+
+
+def write_database(
+    path: Union[str, Path],
+    name_to_official: Dict,
+    official_to_coord: Dict,
+    filter_bits_per_key: int = 10,
+):
+    """
+    Writes the two dictionaries produced by file_to_dicts to a SQLite
+    database. The database is written atomically, so that readers never open
+    a partially written database.
+
+    :param path: where to write the database
+    :param name_to_official: gene name -> official name dictionary
+    :param official_to_coord: official name -> genome location dictionary
+    :param filter_bits_per_key: the size of the name filter per name (see
+        BloomFilter.from_keys); 0 leaves the filter out
+
+    """
+
+    official_to_id = {
+        official_name: locus_id
+        for locus_id, official_name in enumerate(sorted(official_to_coord))
+    }
+    keys = resolution_keys(name_to_official, official_to_coord)
+
+    with atomic_output(path) as tmp_path:
+        connection = sqlite3.connect(tmp_path)
+        try:
+            connection.executescript(_SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            connection.executemany(
+                "INSERT INTO loci VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        locus_id,
+                        official_name,
+                        int(official_to_coord[official_name][0]),
+                        *official_to_coord[official_name][1:],
+                    )
+                    for official_name, locus_id in official_to_id.items()
+                ),
+            )
+            connection.executemany(
+                "INSERT INTO names VALUES (?, ?)",
+                (
+                    (key, official_to_id[official_name])
+                    for key, official_name in keys.items()
+                ),
+            )
+            if filter_bits_per_key > 0:
+                name_filter = BloomFilter.from_keys(keys, filter_bits_per_key)
+                connection.execute(
+                    "INSERT INTO name_filter VALUES (?, ?)",
+                    (name_filter.n_hashes, bytes(name_filter.bits)),
+                )
+            connection.commit()
+        finally:
+            connection.close()
+
+
+class SqliteIndex:
+    """
+    A read-only gene index answering lookups from a SQLite database written
+    by write_database. An index may be shared between threads: each thread
+    queries the database through a connection of its own.
+
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+
+        self._uri = Path(os.path.abspath(path)).as_uri() + "?mode=ro"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+
+        connection = self._connection()
+        try:
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+        except sqlite3.DatabaseError:
+            version = None
+        if version != SCHEMA_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {SCHEMA_VERSION} index")
+
+        self._filter = None
+        row = connection.execute(
+            "SELECT bits, n_hashes FROM name_filter"
+        ).fetchone()
+        if row is not None:
+            self._filter = BloomFilter(*row)
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Returns the calling thread's connection to the database, opening it
+        on first use
+
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Only the opening thread queries through the connection, but
+            # close() may close it from any thread
+            connection = sqlite3.connect(
+                self._uri, uri=True, check_same_thread=False
+            )
+            with self._lock:
+                self._connections.append(connection)
+            self._local.connection = connection
+        return connection
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Closes the database connections of every thread
+
+        """
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+    def lookup(self, gene: str) -> Optional[Dict]:
+        """
+        Looks up a gene name as hgfind() does, ignoring case and falling back
+        on the canonical keys of the names (see hgfind.normalize_name).
+
+        :param gene: the name of a gene
+        :returns: the same dictionary as hgfind() on success, None otherwise
+
+        """
+        connection = self._connection()
+        for key in query_keys(gene):
+            if self._filter is not None and key not in self._filter:
+                continue
+            row = connection.execute(_LOOKUP, (key,)).fetchone()
+            if row is not None:
+                break
+        else:
+            return None
+
+        chr_code, start_coord, end_coord, strand, official_name = row
+        return {
+            "chr_n": CHROMOSOMES[chr_code],
+            "start_coord": start_coord,
+            "end_coord": end_coord,
+            "strand": strand,
+            "official_name": official_name,
+        }
+
+
+def load_sqlite_index(
+    path: Optional[Union[str, Path]] = None,
+    bio_mart_path: Union[str, Path] = PATH_TO_BIO_MART,
+) -> SqliteIndex:
+    """
+    Opens the SQLite index at the given path, building it from the BioMart
+    file first if it does not exist yet or cannot be read.
+
+    :param path: path of the SQLite database; defaults to a content addressed
+        file in the hgfind cache directory, or if that cannot be written, a
+        temporary file removed when the process exits
+    :param bio_mart_path: BioMart file to build the database from if needed
+    :returns: the opened SqliteIndex
+
+    """
+
+    default_path = path is None
+    if default_path:
+        path = cache_path(bio_mart_path, "sqlite", SCHEMA_VERSION, ".sqlite")
+
+    try:
+        return SqliteIndex(path)
+    except (OSError, ValueError, sqlite3.Error):
+        pass
+
+    with build_lock(path):
+        # Another process may have built the database while we were waiting
+        try:
+            return SqliteIndex(path)
+        except (OSError, ValueError, sqlite3.Error):
+            pass
+        dicts = file_to_dicts(bio_mart_path)
+        try:
+            write_database(path, *dicts)
+            return SqliteIndex(path)
+        except OSError:
+            if not default_path:
+                raise
+            print(f"Could not cache in {path.parent}...", file=sys.stderr)
+        path = scratch_path(path.name)
+        write_database(path, *dicts)
+    return SqliteIndex(path)
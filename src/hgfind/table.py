@@ -0,0 +1,74 @@
+"""
+Columnar, genome ordered view of the official genes in a gene index.
+
+Chromosomes are stored by their integer code (see Chromosome.__int__) and
+strands by the codes in STRAND_TO_CODE, so that every column fits in a
+compact typed array.
+
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+STRAND_TO_CODE = {"+": 1, "-": -1, "+/-": 0}
+CODE_TO_STRAND = {code: strand for strand, code in STRAND_TO_CODE.items()}
+
+
+class GeneTable:
+    """
+    The official genes of a gene index as parallel typed arrays, sorted into
+    genome order: by chromosome, then start coordinate, end coordinate and
+    official name. Row i of every column describes the gene names[i].
+
+    """
+
+    def __init__(self, official_to_coord: Dict):
+        order = sorted(
+            official_to_coord.items(),
+            key=lambda item: (
+                int(item[1][0]),
+                item[1][1],
+                item[1][2],
+                item[0],
+            ),
+        )
+
+        self.names: List[str] = [name for name, _ in order]
+        self.chrom = array("b", (int(coord[0]) for _, coord in order))
+        self.start = array("q", (coord[1] for _, coord in order))
+        self.end = array("q", (coord[2] for _, coord in order))
+        self.strand = array(
+            "b", (STRAND_TO_CODE[coord[3]] for _, coord in order)
+        )
+        self.row_of: Dict[str, int] = {
+            name: row for row, name in enumerate(self.names)
+        }
+
+        # Rows are grouped by chromosome: code -> (first row, last row + 1)
+        self.chrom_rows: Dict[int, Tuple[int, int]] = {}
+        for row, code in enumerate(self.chrom):
+            first, _ = self.chrom_rows.get(code, (row, row))
+            self.chrom_rows[code] = (first, row + 1)
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows_on(
+        self,
+        chr_code: int,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ) -> range:
+        """
+        Returns the rows of the genes on the given chromosome, in order,
+        optionally only those starting within [start, end] (found by binary
+        search, as rows are sorted by start)
+
+        """
+        first, stop = self.chrom_rows.get(chr_code, (0, 0))
+        if start is not None:
+            first = bisect_left(self.start, start, first, stop)
+        if end is not None:
+            stop = bisect_right(self.start, end, first, stop)
+        return range(first, stop)
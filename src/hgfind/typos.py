@@ -0,0 +1,136 @@
+"""
+Suggestions of known gene names close to a misspelled one.
+
+Names within a few edits of a query are found through an index of the
+bigrams of every name, padded with "^" and "$", kept apart by name length.
+An edit changes at most two bigrams of a name, so a name within d edits of
+the query differs in length by at most d and shares all but at most 2d of the
+query's distinct bigrams. Only the names passing these filters are compared
+with the query, those sharing the most bigrams first and within a time
+budget, instead of every name.
+
+"""
+
+import time
+from array import array
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# The largest edit distance of a suggestion
+MAX_DISTANCE = 2
+# The time in seconds to spend comparing names with a query
+SUGGESTION_BUDGET = 0.01
+
+
+def _bigrams(key: str) -> Set[str]:
+    padded = f"^{key}$"
+    return {padded[i : i + 2] for i in range(len(padded) - 1)}
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Computes the Levenshtein distance between two strings, giving up as soon
+    as it is sure to exceed max_distance.
+
+    :param a: a string
+    :param b: another string
+    :param max_distance: the largest distance of interest
+    :returns: the distance, or None if it exceeds max_distance
+
+    """
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class NameSuggester:
+    """
+    A bigram index over gene names (case insensitive) for finding the names
+    closest to one that is not known
+
+    """
+
+    def __init__(self, names: Iterable[str]):
+        # Upper-cased keys, each with the first name listed under it
+        key_to_name: Dict[str, str] = {}
+        for name in names:
+            key_to_name.setdefault(name.upper(), name)
+        self.keys = list(key_to_name)
+        self.names = list(key_to_name.values())
+
+        # (key length, bigram) -> the keys of that length with the bigram
+        self.postings: Dict[Tuple[int, str], array] = {}
+        for i, key in enumerate(self.keys):
+            for bigram in _bigrams(key):
+                posting = self.postings.get((len(key), bigram))
+                if posting is None:
+                    posting = self.postings[len(key), bigram] = array("l")
+                posting.append(i)
+
+    def suggest(
+        self,
+        name: str,
+        limit: int = 5,
+        max_distance: int = MAX_DISTANCE,
+        budget: float = SUGGESTION_BUDGET,
+    ) -> List[str]:
+        """
+        Finds the known names closest to a name. Names of up to three
+        characters are only matched within one edit, and single characters
+        not at all, as they have too few bigrams to filter on.
+
+        :param name: the name to find neighbours of (case insensitive)
+        :param limit: the largest number of names to return
+        :param max_distance: the largest edit distance of a suggestion
+        :param budget: the time in seconds to spend comparing names with the
+            query; the best suggestions found in that time are returned
+        :returns: up to limit names other than the given one, nearest first
+            and then alphabetically (case insensitive)
+
+        """
+        deadline = time.perf_counter() + budget
+        query = name.strip().upper()
+        bigrams = _bigrams(query)
+        # Names within the distance must share at least one bigram
+        distance = min(max_distance, (len(bigrams) - 1) // 2)
+        if distance <= 0 or limit <= 0:
+            return []
+
+        threshold = len(bigrams) - 2 * distance
+        lengths = range(len(query) - distance, len(query) + distance + 1)
+        counts = Counter(
+            chain.from_iterable(
+                self.postings.get((length, bigram), ())
+                for length in lengths
+                for bigram in bigrams
+            )
+        )
+        candidates = [i for i, count in counts.items() if count >= threshold]
+        candidates.sort(key=lambda i: -counts[i])
+
+        found = []
+        for n, i in enumerate(candidates):
+            if n and n % 64 == 0 and time.perf_counter() > deadline:
+                break
+            key = self.keys[i]
+            if key == query:
+                continue
+            key_distance = edit_distance(query, key, distance)
+            if key_distance is not None:
+                found.append((key_distance, key, i))
+
+        found.sort()
+        return [self.names[i] for _, _, i in found[:limit]]
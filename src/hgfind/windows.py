@@ -0,0 +1,152 @@
+"""
+Strand-aware windows around genes, such as promoters and flanks, computed
+for whole batches of genes at once with NumPy.
+
+"""
+
+from typing import (
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from .columnar import hgfind_arrays, require_numpy, rows_to_arrays
+from .hgfind import CHROMOSOME_LENGTHS, CHROMOSOMES, GENE_INDEX
+
+if TYPE_CHECKING:
+    import numpy as np
+
+ANCHORS = ("tss", "tes", "gene")
+
+
+class GeneWindows(NamedTuple):
+    """
+    Parallel arrays describing a window around each of a batch of genes;
+    element i of every array describes the i-th gene. Unrecognized names have
+    chromosome and strand code 0, start and end coordinate -1 and official
+    index -1.
+
+    chr_n: chromosome codes (int8), see hgfind.hgfind.CHROMOSOMES
+    start: window start coordinates (int64, 1-based, inclusive)
+    end: window end coordinates (int64, 1-based, inclusive)
+    strand: strand codes of the genes (int8): 1 for '+', -1 for '-', 0 for
+        '+/-'
+    official_index: index into official_names of each gene's official
+        name (int64)
+    official_names: the official names of all genes in the index
+
+    """
+
+    chr_n: "np.ndarray"
+    start: "np.ndarray"
+    end: "np.ndarray"
+    strand: "np.ndarray"
+    official_index: "np.ndarray"
+    official_names: List[str]
+
+    @property
+    def found(self) -> "np.ndarray":
+        """
+        Boolean mask of the names that were recognized
+
+        """
+        return self.official_index >= 0
+
+
+def gene_windows(
+    genes: Optional[Iterable[str]] = None,
+    upstream: int = 2000,
+    downstream: int = 2000,
+    anchor: str = "tss",
+) -> GeneWindows:
+    """
+    Computes a window around each of a batch of genes, oriented by the genes'
+    strands: upstream bases lie before the 5' end of a gene on its strand,
+    downstream bases after it. Genes on both strands ('+/-') are oriented like
+    genes on the forward strand. Windows are clipped to their chromosome.
+
+    :param genes: an iterable of gene names (case insensitive); None computes
+        windows for every official gene, in genome order
+    :param upstream: the number of bases to extend the window upstream
+    :param downstream: the number of bases to extend the window downstream
+    :param anchor: what to extend:
+        'tss': the transcription start site (e.g. for promoters)
+        'tes': the transcription end site
+        'gene': the whole gene (for flanks)
+    :returns: a GeneWindows with one element per gene, in order
+    :raises ValueError: for an unknown anchor or a negative extension
+
+    """
+
+    np = require_numpy()
+
+    if anchor not in ANCHORS:
+        raise ValueError(f"anchor must be one of {', '.join(ANCHORS)}")
+    if upstream < 0 or downstream < 0:
+        raise ValueError("upstream and downstream must not be negative")
+
+    if genes is None:
+        arrays = rows_to_arrays(np.arange(len(GENE_INDEX.table)))
+    else:
+        arrays = hgfind_arrays(genes)
+    found = arrays.found
+    start = arrays.start_coord
+    end = arrays.end_coord
+    reverse = arrays.strand == -1
+
+    if anchor == "tss":
+        start = end = np.where(reverse, end, start)
+    elif anchor == "tes":
+        start = end = np.where(reverse, start, end)
+
+    lengths = np.array(CHROMOSOME_LENGTHS, dtype=np.int64)[arrays.chr_n]
+    window_start = np.maximum(
+        start - np.where(reverse, downstream, upstream), 1
+    )
+    window_end = np.minimum(
+        end + np.where(reverse, upstream, downstream), lengths
+    )
+
+    return GeneWindows(
+        chr_n=arrays.chr_n,
+        start=np.where(found, window_start, -1),
+        end=np.where(found, window_end, -1),
+        strand=arrays.strand,
+        official_index=arrays.official_index,
+        official_names=arrays.official_names,
+    )
+
+
+def windows_bed(windows: GeneWindows) -> Iterator[str]:
+    """
+    Formats windows as BED6 lines with zero-based, half-open intervals, named
+    after the genes' official names. Unrecognized genes are left out.
+
+    :param windows: the windows, as returned by gene_windows
+    :returns: an iterator of BED lines, without trailing newlines
+
+    """
+    strands = {1: "+", -1: "-", 0: "."}
+    names = windows.official_names
+    for chr_code, start, end, strand, index in zip(
+        windows.chr_n.tolist(),
+        windows.start.tolist(),
+        windows.end.tolist(),
+        windows.strand.tolist(),
+        windows.official_index.tolist(),
+    ):
+        if index < 0:
+            continue
+        yield "\t".join(
+            [
+                f"chr{CHROMOSOMES[chr_code]}",
+                str(start - 1),
+                str(end),
+                names[index],
+                "0",
+                strands[strand],
+            ]
+        )
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Tests the sweep-line interval annotation for correctness.
+
+"""
+import random
+import unittest
+
+from src.hgfind.annotate import annotate_bed, annotate_vcf, chromosome_code
+from src.hgfind.hgfind import GENE_INDEX
+from src.hgfind.regions import overlapping_rows
+
+
+def random_bed(n):
+    """
+    Generates n random, unsorted BED records, some on unplaced contigs
+
+    """
+    table = GENE_INDEX.table
+    rng = random.Random(13)
+    codes = sorted(table.chrom_rows)
+    lines = []
+    for i in range(n):
+        chr_code = rng.choice(codes)
+        start = rng.randrange(0, table.end[table.rows_on(chr_code)[-1]])
+        end = start + rng.choice((0, 1, 1000, 3000000))
+        name = "chrUn_KI270302v1" if i % 50 == 0 else f"chr{chr_code}"
+        lines.append(f"{name}\t{start}\t{end}\trecord{i}\n")
+    return lines
+
+
+class TestAnnotate(unittest.TestCase):
+    """
+    Tests to ensure that the sweep finds the same genes as region queries
+
+    """
+
+    def test_chromosome_code(self):
+        """
+        Checks the normalization of sequence names
+
+        """
+
+        self.assertEqual(chromosome_code("chr4"), 4)
+        self.assertEqual(chromosome_code("4"), 4)
+        self.assertEqual(chromosome_code("chrX"), 23)
+        self.assertEqual(chromosome_code("chrM"), 25)
+        self.assertEqual(chromosome_code("MT"), 25)
+        self.assertIsNone(chromosome_code("chrUn_KI270302v1"))
+        self.assertIsNone(chromosome_code("GL000009.2"))
+
+    def test_matches_region_queries(self):
+        """
+        Checks every record of an unsorted file against the interval index
+
+        """
+
+        table = GENE_INDEX.table
+        lines = random_bed(1000)
+        annotated = list(annotate_bed(["track name=test\n"] + lines))
+        self.assertEqual(annotated[0], ("track name=test", None))
+        self.assertEqual(
+            sorted(line for line, _ in annotated[1:]),
+            sorted(line.rstrip("\n") for line in lines),
+        )
+
+        keys = []
+        for line, genes in annotated[1:]:
+            chr_name, start, end, _ = line.split("\t")
+            chr_code = chromosome_code(chr_name)
+            if chr_code is None:
+                self.assertEqual(genes, [])
+                continue
+            start = int(start) + 1
+            end = max(start, int(end))
+            expected = overlapping_rows(chr_code, start, end)
+            self.assertEqual(genes, [table.names[row] for row in expected])
+            keys.append((chr_code, start))
+        self.assertEqual(keys, sorted(keys))
+
+    def test_presorted(self):
+        """
+        Checks that presorted records keep their order and that records out
+        of order are rejected
+
+        """
+
+        lines = [
+            "chr10\t87863624\t87863625\n",
+            "chr4\t82352497\t82352498\n",
+            "chr4\t82352600\t82352700\n",
+        ]
+        annotated = list(annotate_bed(lines, presorted=True))
+        self.assertEqual(
+            [genes for _, genes in annotated],
+            [["PTEN"], ["HNRNPD"], ["HNRNPD"]],
+        )
+        with self.assertRaises(ValueError):
+            list(annotate_bed(lines[::-1], presorted=True))
+        with self.assertRaises(ValueError):
+            list(annotate_bed(["chr4\t10\n"]))
+
+    def test_annotate_vcf(self):
+        """
+        Checks that variants get an INFO field listing overlapping genes,
+        with the field declared in the header
+
+        """
+
+        vcf = [
+            "##fileformat=VCFv4.2\n",
+            "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n",
+            "chr4\t82352500\t.\tA\tG\t.\tPASS\tDP=3\n",
+            "10\t87863620\t.\tACGTAC\tA\t.\tPASS\t.\n",
+            "10\t100\t.\tA\tG\t.\tPASS\t.\n",
+            "chrUn_KI270302v1\t1\t.\tA\tG\t.\tPASS\t.\n",
+        ]
+        lines = list(annotate_vcf(vcf, field="HG"))
+        self.assertEqual(lines[0], "##fileformat=VCFv4.2")
+        self.assertTrue(lines[1].startswith("##INFO=<ID=HG,"))
+        self.assertTrue(lines[2].startswith("#CHROM"))
+        infos = [line.split("\t")[7] for line in lines[3:]]
+        self.assertEqual(infos, ["DP=3;HG=HNRNPD", "HG=PTEN", ".", "."])
+        with self.assertRaises(ValueError):
+            list(annotate_vcf(["chr4\tx\t.\tA\tG\t.\tPASS\t.\n"]))
+
+    def test_unsorted_vcf_matches_region_queries(self):
+        """
+        Checks variants in any order against the interval index
+
+        """
+
+        table = GENE_INDEX.table
+        records = []
+        for line in random_bed(500):
+            chr_name, start, _, _ = line.split("\t")
+            records.append(f"{chr_name}\t{int(start) + 1}\t.\tA\tG\t.\t.\t.")
+
+        for line in annotate_vcf(records):
+            chr_name, pos, _, _, _, _, _, info = line.split("\t")
+            chr_code = chromosome_code(chr_name)
+            rows = (
+                []
+                if chr_code is None
+                else overlapping_rows(chr_code, int(pos), int(pos))
+            )
+            expected = ",".join(table.names[row] for row in rows)
+            self.assertEqual(info, f"GENES={expected}" if rows else ".")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Tests the Bloom filter for correctness.
+
+"""
+import unittest
+
+from src.hgfind.bloom import BloomFilter
+from src.hgfind.hgfind import GENE_INDEX
+
+
+class TestBloomFilter(unittest.TestCase):
+    """
+    Tests to ensure that the filter never rejects a key it contains and
+    rarely accepts one it does not
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.names = list(GENE_INDEX.name_to_official)
+        cls.bloom_filter = BloomFilter.from_keys(cls.names)
+
+    def test_no_false_negatives(self):
+        """
+        Checks that every key added is found
+
+        """
+
+        for name in self.names:
+            self.assertIn(name, self.bloom_filter)
+
+    def test_false_positive_rate(self):
+        """
+        Checks that few keys not added are found, at ten bits per key
+
+        """
+
+        others = [f"NOT-A-GENE-{i}" for i in range(10000)]
+        found = sum(other in self.bloom_filter for other in others)
+        self.assertLess(found, 200)
+        self.assertEqual(
+            len(self.bloom_filter.bits), -(-len(self.names) * 10 // 8)
+        )
+
+    def test_read_only(self):
+        """
+        Checks that a filter read back from its bits finds the same keys
+
+        """
+
+        read_back = BloomFilter(
+            bytes(self.bloom_filter.bits), self.bloom_filter.n_hashes
+        )
+        self.assertIn("AUF1", read_back)
+        self.assertNotIn("4:45-243", read_back)
+
+
+if __name__ == "__main__":
+    unittest.main()
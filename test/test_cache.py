@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Tests the cache helpers for correctness.
+
+"""
+import contextlib
+import importlib
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.hgfind.cache import (
+    CACHE_DIR_ENV,
+    atomic_output,
+    build_lock,
+    cache_path,
+)
+from src.hgfind.hgfind import (
+    PATH_TO_BIO_MART,
+    PICKLE_FORMAT_VERSION,
+    load_dicts,
+)
+from src.hgfind.prebuilt import write_prebuilt
+
+cache_module = importlib.import_module("src.hgfind.cache")
+hgfind_module = importlib.import_module("src.hgfind.hgfind")
+
+
+class TestCache(unittest.TestCase):
+    """
+    Tests to ensure that caches are content addressed and written atomically
+
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.environ = mock.patch.dict(
+            os.environ, {CACHE_DIR_ENV: self.tmp_dir.name}
+        )
+        self.environ.start()
+
+    def tearDown(self):
+        self.environ.stop()
+        self.tmp_dir.cleanup()
+
+    def test_configurable_cache_dir(self):
+        """
+        Checks that caches are placed in the configured cache directory
+
+        """
+
+        path = cache_path(PATH_TO_BIO_MART, "pickle", 1, ".pickle")
+        self.assertEqual(path.parent, Path(self.tmp_dir.name))
+        self.assertEqual(path.suffix, ".pickle")
+
+    def test_content_addressed(self):
+        """
+        Checks that the cache path depends on the source file contents and on
+        the format version
+
+        """
+
+        source = Path(self.tmp_dir.name) / "genes.txt"
+        source.write_text("first\n")
+        first = cache_path(source, "pickle", 1, ".pickle")
+        self.assertNotEqual(first, cache_path(source, "pickle", 2, ".pickle"))
+
+        source.write_text("second, longer\n")
+        self.assertNotEqual(first, cache_path(source, "pickle", 1, ".pickle"))
+
+    def test_atomic_output(self):
+        """
+        Checks that failed writes leave neither the target nor a temporary
+        file behind
+
+        """
+
+        target = Path(self.tmp_dir.name) / "out" / "cache.bin"
+        with self.assertRaises(RuntimeError):
+            with atomic_output(target) as tmp_path:
+                Path(tmp_path).write_bytes(b"half")
+                raise RuntimeError
+        self.assertEqual(os.listdir(target.parent), [])
+
+        with atomic_output(target) as tmp_path:
+            Path(tmp_path).write_bytes(b"whole")
+        self.assertEqual(target.read_bytes(), b"whole")
+        self.assertEqual(os.listdir(target.parent), ["cache.bin"])
+
+    def test_corrupt_cache_is_rebuilt(self):
+        """
+        Checks that a corrupt pickle cache is ignored and replaced
+
+        """
+
+        path = cache_path(
+            PATH_TO_BIO_MART, "pickle", PICKLE_FORMAT_VERSION, ".pickle"
+        )
+        path.write_bytes(b"\x80\x05truncated")
+
+        name_to_official, _ = load_dicts(PATH_TO_BIO_MART)
+        self.assertEqual(name_to_official["AUF1"], "HNRNPD")
+        self.assertNotEqual(path.read_bytes(), b"\x80\x05truncated")
+
+    def test_prebuilt_cache_is_used(self):
+        """
+        Checks that a prebuilt cache is loaded without parsing the BioMart
+        file when the user cache is empty
+
+        """
+
+        with tempfile.TemporaryDirectory() as prebuilt_dir:
+            write_prebuilt(prebuilt_dir)
+            with mock.patch.object(
+                cache_module, "PREBUILT_DIR", Path(prebuilt_dir)
+            ), mock.patch.object(hgfind_module, "file_to_dicts") as parse:
+                name_to_official, _ = load_dicts(PATH_TO_BIO_MART)
+
+        parse.assert_not_called()
+        self.assertEqual(name_to_official["AUF1"], "HNRNPD")
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_build_lock_is_exclusive(self):
+        """
+        Checks that a build lock cannot be acquired while it is held
+
+        """
+
+        path = Path(self.tmp_dir.name) / "cache.pickle"
+        acquired = threading.Event()
+
+        def acquire():
+            with build_lock(path):
+                acquired.set()
+
+        with build_lock(path):
+            waiter = threading.Thread(target=acquire)
+            waiter.start()
+            self.assertFalse(acquired.wait(0.2))
+        self.assertTrue(acquired.wait(5))
+        waiter.join()
+
+    def test_cache_built_while_waiting_is_used(self):
+        """
+        Checks that a process that waited for the build lock loads the cache
+        built by the lock holder instead of parsing the BioMart file again
+
+        """
+
+        path = cache_path(
+            PATH_TO_BIO_MART, "pickle", PICKLE_FORMAT_VERSION, ".pickle"
+        )
+        dicts = load_dicts(PATH_TO_BIO_MART)
+        path.unlink()
+
+        @contextlib.contextmanager
+        def built_by_other_process(lock_path):
+            with build_lock(lock_path):
+                hgfind_module.dump_dicts(path, *dicts)
+                yield
+
+        with mock.patch.object(
+            cache_module, "build_lock", built_by_other_process
+        ), mock.patch.object(hgfind_module, "file_to_dicts") as parse:
+            name_to_official, _ = load_dicts(PATH_TO_BIO_MART)
+
+        parse.assert_not_called()
+        self.assertEqual(name_to_official["AUF1"], "HNRNPD")
+
+
+if __name__ == "__main__":
+    unittest.main()
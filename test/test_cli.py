@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Tests the command line interface for correctness.
+
+"""
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+from src.hgfind.cli import main
+from src.hgfind.hgfind import GENE_INDEX
+
+
+def run(argv, stdin=""):
+    """
+    Runs the command line interface, returning its exit status and output
+
+    """
+    stdout = io.StringIO()
+    with redirect_stdout(stdout), mock.patch("sys.stdin", io.StringIO(stdin)):
+        try:
+            main(argv)
+            status = 0
+        except SystemExit as exit_:
+            status = exit_.code
+    return status, stdout.getvalue().splitlines()
+
+
+class TestCommandLine(unittest.TestCase):
+    """
+    Tests to ensure that the command line interface behaves as documented
+
+    """
+
+    def test_single_gene(self):
+        """
+        Checks the output for a single recognized and unrecognized gene
+
+        """
+
+        self.assertEqual(
+            run(["auf1"]), (0, ["HNRNPD => 4:82352498-82374503 (-)"])
+        )
+        self.assertEqual(
+            run(["fjlsfl"]), (1, ["fjlsfl not recognized as a gene"])
+        )
+
+    def test_single_gene_from_mapped_index(self):
+        """
+        Checks that a single gene is answered without the resident index
+
+        """
+
+        with mock.patch.object(GENE_INDEX, "lookup") as lookup:
+            self.assertEqual(
+                run(["il-1 beta"]), (0, ["IL1B => 2:112829751-112836816 (-)"])
+            )
+        lookup.assert_not_called()
+
+    def test_backends(self):
+        """
+        Checks that every backend gives the same output
+
+        """
+
+        expected = run(["auf1", "pten", "gsjfg", "-f", "tsv"])
+        self.assertEqual(expected[0], 1)
+        for backend in ("memory", "mmap", "sqlite"):
+            self.assertEqual(
+                run(["auf1", "pten", "gsjfg", "-f", "tsv", "-b", backend]),
+                expected,
+            )
+
+    def test_many_genes_from_all_sources(self):
+        """
+        Checks that arguments, stdin and input files are all read, in order
+
+        """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "genes.txt"
+            path.write_text("PTEN\n\nneat2\n")
+            status, lines = run(
+                ["HNRNPC", "-", "--input", str(path), "-f", "tsv"],
+                stdin="auf1\ngsjfg\n",
+            )
+
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            [line.split("\t")[:2] for line in lines],
+            [
+                ["HNRNPC", "HNRNPC"],
+                ["auf1", "HNRNPD"],
+                ["gsjfg", ""],
+                ["PTEN", "PTEN"],
+                ["neat2", "MALAT1"],
+            ],
+        )
+
+    def test_formats(self):
+        """
+        Checks the jsonl and bed output formats
+
+        """
+
+        _, lines = run(["auf1", "-f", "jsonl"])
+        record = json.loads(lines[0])
+        self.assertEqual(record["official_name"], "HNRNPD")
+        self.assertEqual(record["chr"], "4")
+
+        _, lines = run(["auf1", "-f", "bed"])
+        self.assertEqual(lines, ["chr4\t82352497\t82374503\tHNRNPD\t0\t-"])
+
+    def test_region(self):
+        """
+        Checks that regions list their overlapping genes and that invalid
+        regions are reported
+
+        """
+
+        status, lines = run(["region", "4:82352498-82374503"])
+        self.assertEqual(status, 0)
+        self.assertIn("HNRNPD => 4:82352498-82374503 (-)", lines)
+
+        status, lines = run(["region", "-"], stdin="gsjfg\n")
+        self.assertEqual((status, lines), (1, []))
+
+    def test_annotate_bed(self):
+        """
+        Checks that BED records get a column of overlapping genes
+
+        """
+
+        bed = "chr10\t87863624\t87863625\tb\nchr4\t82352497\t82352498\ta\n"
+        status, lines = run(["annotate-bed"], stdin=bed)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            lines,
+            [
+                "chr4\t82352497\t82352498\ta\tHNRNPD",
+                "chr10\t87863624\t87863625\tb\tPTEN",
+            ],
+        )
+
+        status, lines = run(["annotate-bed", "--sorted"], stdin="4\t9\t1\n")
+        self.assertEqual((status, lines), (0, ["4\t9\t1\t."]))
+        status, _ = run(["annotate-bed"], stdin="4\tx\t1\n")
+        self.assertEqual(status, 1)
+
+    def test_annotate_vcf(self):
+        """
+        Checks that a gzipped VCF file is annotated
+
+        """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "variants.vcf.gz"
+            with gzip.open(path, "wt") as handle:
+                handle.write("#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\n")
+                handle.write("chr10\t87863625\t.\tA\tG\t.\tPASS\t.\n")
+            status, lines = run(["annotate-vcf", str(path)])
+
+        self.assertEqual(status, 0)
+        self.assertTrue(lines[0].startswith("##INFO=<ID=GENES,"))
+        self.assertEqual(lines[-1].split("\t")[-1], "GENES=PTEN")
+
+    def test_closed_pipe(self):
+        """
+        Checks that output to a pipe closed early ends quietly, e.g. when
+        piped into head
+
+        """
+
+        with tempfile.TemporaryFile() as genes:
+            genes.write(b"PTEN\n" * 20000)
+            genes.seek(0)
+            process = subprocess.Popen(
+                [sys.executable, "-m", "src.hgfind", "-"],
+                stdin=genes,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            first_line = process.stdout.readline()
+            process.stdout.close()
+            stderr = process.stderr.read()
+            process.stderr.close()
+
+        self.assertEqual(first_line, b"PTEN => 10:87863625-87971930 (+)\n")
+        self.assertEqual(process.wait(), 1)
+        self.assertEqual(stderr, b"")
+
+    def test_answers_while_reading(self):
+        """
+        Checks that genes read from a pipe are answered before the pipe is
+        closed
+
+        """
+
+        # Output is only block buffered if Python is left to buffer it
+        env = dict(os.environ)
+        env.pop("PYTHONUNBUFFERED", None)
+        for argv, query, expected in [
+            (["-"], b"AUF1\n", b"HNRNPD => 4:82352498-82374503 (-)\n"),
+            (["region", "-"], b"4:82352498\n", b"HNRNPD => 4:82352498"),
+        ]:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "src.hgfind"] + argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                env=env,
+            )
+            process.stdin.write(query)
+            process.stdin.flush()
+            lines = []
+            reader = threading.Thread(
+                target=lambda: lines.append(process.stdout.readline())
+            )
+            reader.start()
+            reader.join(60)
+            answered = not reader.is_alive()
+            process.stdin.close()
+            reader.join()
+            process.stdout.close()
+            process.wait()
+            self.assertTrue(answered, argv)
+            self.assertTrue(lines[0].startswith(expected), argv)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests the columnar NumPy output for correctness.
+
+"""
+import unittest
+
+from src.hgfind.columnar import hgfind_arrays
+from src.hgfind.hgfind import CHROMOSOMES, hgfind
+from src.hgfind.table import CODE_TO_STRAND
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestHgfindArrays(unittest.TestCase):
+    """
+    Tests to ensure that columnar lookups agree with hgfind
+
+    """
+
+    def test_matches_hgfind(self):
+        """
+        Checks that every array element describes the queried gene
+
+        """
+
+        genes = ["HNRNPC", "auf1", "Neat2", "PTEN"]
+        arrays = hgfind_arrays(genes)
+
+        self.assertEqual(arrays.chr_n.dtype, np.int8)
+        self.assertEqual(arrays.start_coord.dtype, np.int64)
+        for i, gene in enumerate(genes):
+            result = hgfind(gene)
+            self.assertEqual(CHROMOSOMES[arrays.chr_n[i]], result["chr_n"])
+            self.assertEqual(arrays.start_coord[i], result["start_coord"])
+            self.assertEqual(arrays.end_coord[i], result["end_coord"])
+            self.assertEqual(
+                CODE_TO_STRAND[arrays.strand[i]], result["strand"]
+            )
+            self.assertEqual(
+                arrays.official_names[arrays.official_index[i]],
+                result["official_name"],
+            )
+
+    def test_unrecognized_names(self):
+        """
+        Checks that unrecognized names are masked out
+
+        """
+
+        arrays = hgfind_arrays(["gsjfg", "AUF1", "4:45-243"])
+        self.assertEqual(arrays.found.tolist(), [False, True, False])
+        self.assertEqual(arrays.official_index[0], -1)
+        self.assertEqual(arrays.start_coord[2], -1)
+        self.assertEqual(arrays.chr_n[2], 0)
+
+    def test_empty_batch(self):
+        """
+        Checks that an empty batch gives empty arrays
+
+        """
+
+        self.assertEqual(len(hgfind_arrays([]).chr_n), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
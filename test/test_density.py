@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests the gene density binning for correctness.
+
+"""
+import unittest
+
+from src.hgfind.density import gene_density
+from src.hgfind.hgfind import CHROMOSOME_LENGTHS, GENE_INDEX
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestGeneDensity(unittest.TestCase):
+    """
+    Tests to ensure that the binned densities match a base by base count
+
+    """
+
+    def test_matches_brute_force(self):
+        """
+        Checks the counts and covered bases of the mitochondrial chromosome
+        and of a bin size that does not divide its length
+
+        """
+
+        table = GENE_INDEX.table
+        bin_size = 1000
+        density = gene_density(bin_size)[25]
+
+        length = CHROMOSOME_LENGTHS[25]
+        depth = np.zeros(length + 1, dtype=np.int64)
+        counts = np.zeros(len(density.counts), dtype=np.int64)
+        for row in table.rows_on(25):
+            depth[table.start[row] : table.end[row] + 1] += 1
+            first = (table.start[row] - 1) // bin_size
+            counts[first : (table.end[row] - 1) // bin_size + 1] += 1
+        covered = np.add.reduceat(
+            depth[1:] > 0, np.arange(0, length, bin_size)
+        )
+
+        self.assertEqual(len(density.counts), -(-length // bin_size))
+        np.testing.assert_array_equal(density.counts, counts)
+        np.testing.assert_array_equal(density.covered, covered)
+
+    def test_whole_genome(self):
+        """
+        Checks the bins of every chromosome against its genes and length
+
+        """
+
+        table = GENE_INDEX.table
+        densities = gene_density(1000000)
+        self.assertEqual(len(densities), len(table.chrom_rows))
+        for chr_n, density in densities.items():
+            code = int(chr_n)
+            self.assertEqual(
+                len(density.counts), -(-CHROMOSOME_LENGTHS[code] // 1000000)
+            )
+            self.assertLessEqual(density.covered.max(), 1000000)
+            self.assertGreater(density.counts.sum(), 0)
+            self.assertGreaterEqual(
+                density.counts.sum(), len(table.rows_on(code))
+            )
+
+        self.assertIs(gene_density(1000000), densities)
+        self.assertRaises(ValueError, gene_density, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,9 +3,27 @@
 Tests the hgfind module for correctness.
 
 """
+import importlib
+import pickle
+import threading
 import unittest
+from unittest import mock
 
-from src.hgfind.hgfind import WrongGeneName, hgfind
+from src.hgfind.hgfind import (
+    BACKENDS,
+    GENE_INDEX,
+    PATH_TO_BIO_MART,
+    GeneIndex,
+    WrongGeneName,
+    file_to_dicts,
+    hgfind,
+    hgfind_many,
+    lookup,
+    normalize_name,
+)
+
+# The package re-exports the hgfind() function under the module's own name
+hgfind_module = importlib.import_module("src.hgfind.hgfind")
 
 
 class TestGeneToCoord(unittest.TestCase):
@@ -56,6 +74,293 @@ class TestGeneToCoord(unittest.TestCase):
         self.assertRaises(WrongGeneName, hgfind, "gsjfg")
         self.assertRaises(WrongGeneName, hgfind, "4:45-243")
 
+    def test_lookup(self):
+        """
+        Checks that lookup resolves names as hgfind does, returning None
+        rather than raising for unrecognized names
+
+        """
+
+        self.assertEqual(lookup("auf1"), hgfind("AUF1"))
+        self.assertEqual(lookup("IL-1 beta"), hgfind("IL1B"))
+        self.assertIsNone(lookup("gsjfg"))
+        self.assertIsNone(lookup("4:45-243"))
+
+        self.assertEqual(GENE_INDEX.lookup("auf1"), lookup("auf1"))
+        self.assertEqual(GENE_INDEX.lookup_exact("AUF1"), lookup("auf1"))
+        self.assertIsNone(GENE_INDEX.lookup_exact("auf1"))
+
+    def test_backends(self):
+        """
+        Checks that every backend resolves names as the resident index does,
+        and that the default backend is used unless one is given
+
+        """
+
+        for backend in BACKENDS:
+            self.assertEqual(hgfind("auf1", backend=backend), hgfind("AUF1"))
+            self.assertEqual(
+                lookup("IL-1 beta", backend=backend), hgfind("IL1B")
+            )
+            self.assertIsNone(lookup("gsjfg", backend=backend))
+            self.assertRaises(WrongGeneName, hgfind, "gsjfg", backend=backend)
+
+        self.assertRaises(ValueError, lookup, "AUF1", backend="pickle")
+        with mock.patch.object(hgfind_module, "DEFAULT_BACKEND", "pickle"):
+            self.assertRaises(ValueError, hgfind, "AUF1")
+            self.assertEqual(
+                hgfind("AUF1", backend="mmap"), lookup("AUF1", "memory")
+            )
+
+    def test_suggestions(self):
+        """
+        Checks that unrecognized names come with suggestions of close names
+
+        """
+
+        with self.assertRaises(WrongGeneName) as raised:
+            hgfind("hnrncp")
+        self.assertEqual(raised.exception.args[0]["gene"], "HNRNCP")
+        self.assertIn("HNRNPC", raised.exception.suggestions)
+        self.assertIn("'HNRNPC'", str(raised.exception))
+
+        with self.assertRaises(WrongGeneName) as raised:
+            hgfind_many(["4:45-243"], on_missing="raise")
+        self.assertEqual(raised.exception.suggestions, [])
+
+        # Suggestions are only searched for once asked for
+        with mock.patch.object(
+            GENE_INDEX, "suggest", return_value=["PTEN"]
+        ) as suggest:
+            with self.assertRaises(WrongGeneName) as raised:
+                hgfind("PTEM")
+            suggest.assert_not_called()
+            self.assertEqual(raised.exception.suggestions, ["PTEN"])
+            self.assertEqual(raised.exception.suggestions, ["PTEN"])
+        suggest.assert_called_once_with("PTEM")
+
+    def test_pickled_error(self):
+        """
+        Checks that errors for unrecognized names survive pickling, e.g. to
+        be raised in the parent of a process pool
+
+        """
+
+        with self.assertRaises(WrongGeneName) as raised:
+            hgfind("hnrncp")
+        error = pickle.loads(pickle.dumps(raised.exception))
+        self.assertEqual(error.args, raised.exception.args)
+        self.assertEqual(str(error), str(raised.exception))
+        self.assertIn("HNRNPC", error.suggestions)
+
+    def test_normalized_names(self):
+        """
+        Checks that names listed in lower case, and spelling variants of
+        names, are recognized
+
+        """
+
+        self.assertEqual(hgfind("c15orf40")["official_name"], "C15orf40")
+        for gene in ["IL-1 beta", "il1\u03b2", "IL1.B", "IL1\u2013BETA"]:
+            self.assertEqual(hgfind(gene), hgfind("IL1B"))
+        self.assertEqual(hgfind("TNF-alpha")["official_name"], "TNF")
+
+        # A name matching up to case takes precedence over a canonical key
+        self.assertEqual(hgfind("eIF3-gamma")["official_name"], "EIF3H")
+        self.assertEqual(hgfind("EIF3G")["official_name"], "EIF3G")
+
+        results, missing = hgfind_many(["c15orf40", "IL-1 beta"])
+        self.assertEqual(missing, [])
+        self.assertEqual(results["IL-1 beta"], hgfind("IL1B"))
+
+    def test_normalize_name(self):
+        """
+        Checks that canonical keys drop separators and spell Greek letters
+        the HGNC way, without mangling other names
+
+        """
+
+        self.assertEqual(normalize_name(" hnRNP-C "), "HNRNPC")
+        self.assertEqual(normalize_name("PPAR\u03b3"), "PPARG")
+        self.assertEqual(normalize_name("GFR-ALPHA-1"), "GFRA1")
+        self.assertEqual(normalize_name("Beta"), "BETA")
+        self.assertEqual(normalize_name("METAP2"), "METAP2")
+        self.assertEqual(normalize_name("Y_RNA"), "Y_RNA")
+
+    def test_all_matches(self):
+        """
+        Checks that every gene an ambiguous name is listed for is found,
+        starting with the one hgfind returns without all_matches
+
+        """
+
+        results = hgfind("cpn1", all_matches=True)
+        self.assertEqual(results[0], hgfind("CPN1"))
+        self.assertEqual(
+            [result["official_name"] for result in results],
+            ["CPN1", "CYP11B1", "CPNE1"],
+        )
+
+        # Genes sharing an official name on several chromosomes
+        results = hgfind("Y_RNA", all_matches=True)
+        self.assertEqual(results[0], hgfind("Y_RNA"))
+        self.assertEqual(len({result["chr_n"] for result in results}), 24)
+
+        # Names are resolved as without all_matches
+        results = hgfind("il 21", all_matches=True)
+        self.assertEqual(results, hgfind("IL-21", all_matches=True))
+        self.assertEqual(results[0], hgfind("il 21"))
+        self.assertEqual(len(results), 3)
+
+        # Names listed for several genes without resolving to any of them
+        self.assertRaises(WrongGeneName, hgfind, "ARP6")
+        results = hgfind("arp6", all_matches=True)
+        self.assertEqual(
+            [result["official_name"] for result in results],
+            ["ACTR6", "APOBEC3D", "APOBEC3DE"],
+        )
+        self.assertEqual(len(hgfind("FANCD", all_matches=True)), 2)
+
+        self.assertEqual(hgfind("TP53", all_matches=True), [hgfind("TP53")])
+        self.assertRaises(WrongGeneName, hgfind, "gsjfg", all_matches=True)
+
+
+class TestHgfindMany(unittest.TestCase):
+    """
+    Tests to ensure that batch lookups agree with single lookups
+
+    """
+
+    def test_matches_hgfind(self):
+        """
+        Checks that every recognized name resolves as with hgfind
+
+        """
+
+        genes = ["HNRNPC", "auf1", "Neat2", "AUF1", "auf1"]
+        results, missing = hgfind_many(genes)
+        self.assertEqual(missing, [])
+        self.assertEqual(sorted(results), sorted(set(genes)))
+        for gene in genes:
+            self.assertEqual(results[gene], hgfind(gene))
+
+    def test_on_missing(self):
+        """
+        Checks that unrecognized names are collected, skipped or raised
+
+        """
+
+        genes = ["gsjfg", "HNRNPC", "4:45-243", "gsjfg"]
+
+        results, missing = hgfind_many(genes)
+        self.assertEqual(list(results), ["HNRNPC"])
+        self.assertEqual(missing, ["gsjfg", "4:45-243"])
+
+        results, missing = hgfind_many(genes, on_missing="skip")
+        self.assertEqual(list(results), ["HNRNPC"])
+        self.assertEqual(missing, [])
+
+        self.assertRaises(
+            WrongGeneName, hgfind_many, genes, on_missing="raise"
+        )
+        self.assertRaises(ValueError, hgfind_many, genes, on_missing="warn")
+
+
+class TestFileToDicts(unittest.TestCase):
+    """
+    Tests to ensure that parsing the BioMart file is deterministic
+
+    """
+
+    def test_chunks_cover_every_row_once(self):
+        """
+        Checks that splitting the file into many chunks parses the same rows
+        as parsing it in one go
+
+        """
+
+        (whole,) = hgfind_module._split_file(PATH_TO_BIO_MART, 1)
+        rows = hgfind_module._parse_rows(PATH_TO_BIO_MART, *whole)
+
+        chunks = hgfind_module._split_file(PATH_TO_BIO_MART, 97)
+        self.assertEqual(len(chunks), 97)
+        chunked_rows = [
+            row
+            for chunk in chunks
+            for row in hgfind_module._parse_rows(PATH_TO_BIO_MART, *chunk)
+        ]
+        self.assertEqual(chunked_rows, rows)
+
+    def test_parallel_parse_matches_sequential(self):
+        """
+        Checks that parsing with a process pool gives identical dictionaries
+
+        """
+
+        name_to_official, official_to_coord = file_to_dicts(PATH_TO_BIO_MART)
+        self.assertEqual(
+            file_to_dicts(PATH_TO_BIO_MART, processes=2),
+            (name_to_official, official_to_coord),
+        )
+        self.assertEqual(
+            list(official_to_coord), list(GENE_INDEX.official_to_coord)
+        )
+
+
+class TestGeneIndex(unittest.TestCase):
+    """
+    Tests to ensure that the resident gene index is loaded once and reused
+
+    """
+
+    def test_index_is_resident(self):
+        """
+        Checks that repeated lookups reuse the same loaded dictionaries
+
+        """
+
+        hgfind("HNRNPC")
+        name_to_official = GENE_INDEX.name_to_official
+        hgfind("AUF1")
+        self.assertIs(GENE_INDEX.name_to_official, name_to_official)
+
+    def test_clear_and_reload(self):
+        """
+        Checks that a cleared index is transparently loaded again
+
+        """
+
+        GENE_INDEX.clear()
+        self.assertFalse(GENE_INDEX.is_loaded)
+        self.assertEqual(hgfind("AUF1")["official_name"], "HNRNPD")
+        self.assertTrue(GENE_INDEX.is_loaded)
+
+        GENE_INDEX.reload()
+        self.assertEqual(hgfind("AUF1")["official_name"], "HNRNPD")
+
+    def test_concurrent_first_use(self):
+        """
+        Checks that concurrent first uses load the dictionaries only once
+
+        """
+
+        dicts = GENE_INDEX.name_to_official, GENE_INDEX.official_to_coord
+        index = GeneIndex()
+        with mock.patch.object(
+            hgfind_module, "load_dicts", return_value=dicts
+        ) as load_dicts:
+            threads = [
+                threading.Thread(target=index.lookup, args=("HNRNPC",))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        load_dicts.assert_called_once()
+        self.assertEqual(index.lookup("HNRNPC")["official_name"], "HNRNPC")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Tests the per-locus gene coordinates for correctness.
+
+"""
+import importlib
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.hgfind.cache import CACHE_DIR_ENV, cache_path
+from src.hgfind.hgfind import (
+    GENE_INDEX,
+    PATH_TO_BIO_MART,
+    WrongGeneName,
+    hgfind,
+)
+from src.hgfind.loci import (
+    LOCI_FORMAT_VERSION,
+    GeneLoci,
+    dump_loci,
+    hgfind_loci,
+    index_loci,
+    load_loci,
+    order_digest,
+)
+from src.hgfind.regions import hgfind_region
+from src.hgfind.table import CODE_TO_STRAND
+
+loci_module = importlib.import_module("src.hgfind.loci")
+
+
+class TestGeneLoci(unittest.TestCase):
+    """
+    Tests to ensure that every locus of a gene is kept and that the loci
+    agree with the collapsed gene locations
+
+    """
+
+    def test_single_locus(self):
+        """
+        Checks that a gene listed at one locus has just that locus
+
+        """
+
+        self.assertEqual(hgfind_loci("auf1"), [hgfind("auf1")])
+        self.assertRaises(WrongGeneName, hgfind_loci, "gewgwre")
+
+    def test_several_loci(self):
+        """
+        Checks that a gene listed at two loci keeps both
+
+        """
+
+        loci = hgfind_loci("DDX11L1")
+        self.assertEqual(
+            [(locus["start_coord"], locus["end_coord"]) for locus in loci],
+            [(11869, 14409), (182696, 184174)],
+        )
+        self.assertTrue(
+            all(locus["official_name"] == "DDX11L1" for locus in loci)
+        )
+
+    def test_loci_span_gene_locations(self):
+        """
+        Checks that the loci of every gene span exactly its location
+
+        """
+
+        table = GENE_INDEX.table
+        loci = index_loci(GENE_INDEX)
+        self.assertEqual(loci.n_genes, len(table))
+        for row in range(len(table)):
+            positions = loci.loci_of(row)
+            self.assertTrue(positions)
+            self.assertEqual(
+                min(loci.start[i] for i in positions), table.start[row]
+            )
+            self.assertEqual(
+                max(loci.end[i] for i in positions), table.end[row]
+            )
+            strands = {CODE_TO_STRAND[loci.strand[i]] for i in positions}
+            strand = CODE_TO_STRAND[table.strand[row]]
+            self.assertEqual(
+                strands, {"+", "-"} if strand == "+/-" else {strand}
+            )
+
+    def test_region_by_locus(self):
+        """
+        Checks that a region between two loci of a gene overlaps its span but
+        none of its loci
+
+        """
+
+        def names(results):
+            return [result["official_name"] for result in results]
+
+        self.assertIn("DDX11L1", names(hgfind_region("1:100000-100001")))
+        self.assertNotIn(
+            "DDX11L1", names(hgfind_region("1:100000-100001", by_locus=True))
+        )
+        self.assertIn(
+            "DDX11L1", names(hgfind_region("1:183000-183001", by_locus=True))
+        )
+
+    def test_cached(self):
+        """
+        Checks that the loci are cached and read back without parsing
+
+        """
+
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.dict(
+            os.environ, {CACHE_DIR_ENV: tmp_dir}
+        ):
+            loci = load_loci(PATH_TO_BIO_MART)
+            self.assertEqual(len(os.listdir(tmp_dir)), 2)  # cache and lock
+            with mock.patch.object(loci_module, "file_to_index") as parse:
+                cached = load_loci(PATH_TO_BIO_MART)
+
+        parse.assert_not_called()
+        self.assertEqual(cached.offsets, loci.offsets)
+        self.assertEqual(cached.start, loci.start)
+        self.assertEqual(cached.end, loci.end)
+        self.assertEqual(cached.strand, loci.strand)
+
+    def test_cache_for_other_order_is_rebuilt(self):
+        """
+        Checks that cached loci aligned with another gene order are rebuilt
+        rather than used
+
+        """
+
+        names_digest = order_digest(GENE_INDEX.table.names)
+        loci = index_loci(GENE_INDEX)
+        stale = GeneLoci(
+            loci.offsets,
+            loci.start,
+            loci.end,
+            loci.strand,
+            order_digest(reversed(GENE_INDEX.table.names)),
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.dict(
+            os.environ, {CACHE_DIR_ENV: tmp_dir}
+        ):
+            path = cache_path(
+                PATH_TO_BIO_MART, "loci", LOCI_FORMAT_VERSION, ".pickle"
+            )
+            dump_loci(path, stale)
+            self.assertNotEqual(
+                load_loci(PATH_TO_BIO_MART).names_digest, names_digest
+            )
+            rebuilt = load_loci(PATH_TO_BIO_MART, names_digest=names_digest)
+            self.assertEqual(rebuilt.names_digest, names_digest)
+            self.assertEqual(
+                load_loci(PATH_TO_BIO_MART).names_digest, names_digest
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests the nearest gene queries for correctness.
+
+"""
+import random
+import unittest
+
+from src.hgfind.hgfind import GENE_INDEX
+from src.hgfind.nearest import (
+    hgfind_nearest,
+    nearest_arrays,
+    nearest_rows,
+    signed_distance,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def brute_force(table, chr_code, start, end):
+    """
+    Computes the distance from a region to every gene on its chromosome by
+    scanning every row, nearest first
+
+    """
+    distances = [
+        (abs(signed_distance(table, row, start, end)), row)
+        for row in table.rows_on(chr_code)
+    ]
+    return sorted(distances)
+
+
+def random_queries(table, n):
+    """
+    Picks n random regions on chromosomes that have genes
+
+    """
+    rng = random.Random(12)
+    codes = sorted(table.chrom_rows)
+    queries = []
+    for _ in range(n):
+        chr_code = rng.choice(codes)
+        start = rng.randrange(1, table.end[table.rows_on(chr_code)[-1]])
+        queries.append((chr_code, start, start + rng.choice((0, 0, 5000))))
+    return queries
+
+
+class TestNearest(unittest.TestCase):
+    """
+    Tests to ensure that nearest gene queries find the closest genes
+
+    """
+
+    def test_signed_distance(self):
+        """
+        Checks the sign convention on genes of either strand
+
+        """
+
+        table = GENE_INDEX.table
+        row = table.row_of["HNRNPD"]  # on the reverse strand
+        start, end = table.start[row], table.end[row]
+        self.assertEqual(signed_distance(table, row, start, start), 0)
+        self.assertEqual(signed_distance(table, row, end + 10, end + 20), -10)
+        self.assertEqual(signed_distance(table, row, start - 5, start - 5), 5)
+
+        row = table.row_of["PTEN"]  # on the forward strand
+        start = table.start[row]
+        self.assertEqual(signed_distance(table, row, start - 5, start - 5), -5)
+
+    def test_hgfind_nearest(self):
+        """
+        Checks that a position inside a gene finds that gene first
+
+        """
+
+        results = hgfind_nearest("10:87863625", k=3)
+        self.assertEqual(len(results), 3)
+        self.assertIn("PTEN", [r["official_name"] for r in results])
+        self.assertEqual(results[0]["distance"], 0)
+        distances = [abs(r["distance"]) for r in results]
+        self.assertEqual(distances, sorted(distances))
+        self.assertRaises(ValueError, hgfind_nearest, "PTEN")
+
+    def test_matches_brute_force(self):
+        """
+        Checks the k nearest genes against a scan of the whole chromosome
+
+        """
+
+        table = GENE_INDEX.table
+        for chr_code, start, end in random_queries(table, 200):
+            expected = brute_force(table, chr_code, start, end)[:5]
+            found = nearest_rows(chr_code, start, end, k=5)
+            self.assertEqual(
+                [abs(distance) for _, distance in found],
+                [distance for distance, _ in expected],
+            )
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_nearest_arrays(self):
+        """
+        Checks that the batched query agrees with the single queries
+
+        """
+
+        table = GENE_INDEX.table
+        queries = random_queries(table, 500) + [(25, 1, 1), (23, 1, 10)]
+        chr_n, start, end = (np.array(column) for column in zip(*queries))
+        arrays = nearest_arrays(chr_n, start, end)
+
+        for i, (chr_code, q_start, q_end) in enumerate(queries):
+            [(_, distance)] = nearest_rows(chr_code, q_start, q_end)
+            self.assertEqual(abs(arrays.distance[i]), abs(distance))
+            found = arrays.official_index[i]
+            self.assertEqual(table.chrom[found], chr_code)
+            self.assertEqual(
+                signed_distance(table, found, q_start, q_end),
+                arrays.distance[i],
+            )
+
+        positions = nearest_arrays(chr_n, start)
+        self.assertEqual(len(positions.official_index), len(queries))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_k_nearest_arrays(self):
+        """
+        Checks the k nearest genes of a batch against the single queries
+
+        """
+
+        table = GENE_INDEX.table
+        queries = random_queries(table, 500) + [(25, 1, 1), (23, 1, 10)]
+        queries.append((4, 82352498, 82374503))  # overlapped by two genes
+        queries.append((1, 1000000, 5000000))  # overlapped by many genes
+        chr_n, start, end = (np.array(column) for column in zip(*queries))
+        arrays = nearest_arrays(chr_n, start, end, k=5)
+        self.assertEqual(arrays.official_index.shape, (len(queries), 5))
+
+        for i, (chr_code, q_start, q_end) in enumerate(queries):
+            expected = nearest_rows(chr_code, q_start, q_end, k=5)
+            found = [row for row in arrays.official_index[i] if row >= 0]
+            self.assertEqual(len(found), len(expected))
+            self.assertEqual(len(set(found)), len(found))
+            self.assertEqual(
+                [
+                    abs(distance)
+                    for distance in arrays.distance[i][: len(found)]
+                ],
+                [abs(distance) for _, distance in expected],
+            )
+            for row, distance in zip(found, arrays.distance[i]):
+                self.assertEqual(
+                    signed_distance(table, row, q_start, q_end), distance
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests the gene set proximity join for correctness.
+
+"""
+import random
+import unittest
+
+from src.hgfind.hgfind import GENE_INDEX, WrongGeneName, hgfind
+from src.hgfind.proximity import GenePair, proximity_join
+
+
+def brute_force(genes_a, genes_b, max_distance):
+    """
+    Finds the pairs within max_distance by comparing every pair
+
+    """
+    pairs = set()
+    for gene_a in genes_a:
+        a = hgfind(gene_a)
+        for gene_b in genes_b:
+            b = hgfind(gene_b)
+            if a["chr_n"] != b["chr_n"]:
+                continue
+            distance = max(
+                0,
+                b["start_coord"] - a["end_coord"],
+                a["start_coord"] - b["end_coord"],
+            )
+            if distance <= max_distance:
+                pairs.add(GenePair(gene_a, gene_b, distance))
+    return pairs
+
+
+class TestProximityJoin(unittest.TestCase):
+    """
+    Tests to ensure that the join finds exactly the nearby pairs
+
+    """
+
+    def test_matches_brute_force(self):
+        """
+        Checks random gene lists against a comparison of every pair
+
+        """
+
+        rng = random.Random(17)
+        names = sorted(
+            name for name in GENE_INDEX.official_to_coord if name.isupper()
+        )
+        genes_a = rng.sample(names, 300)
+        genes_b = rng.sample(names, 300) + genes_a[:20]
+        for max_distance in (0, 100000, 2000000):
+            pairs, missing = proximity_join(genes_a, genes_b, max_distance)
+            self.assertEqual(missing, [])
+            self.assertEqual(len(pairs), len(set(pairs)))
+            self.assertEqual(
+                set(pairs), brute_force(genes_a, genes_b, max_distance)
+            )
+
+    def test_names_as_given(self):
+        """
+        Checks that synonyms keep the names given and that unrecognized
+        names are reported
+
+        """
+
+        pairs, missing = proximity_join(
+            ["auf1", "HNRNPD", "fdsjkl"], ["HNRNPD-DT", "fdsjkl", "xq1"]
+        )
+        self.assertEqual(
+            pairs,
+            [
+                GenePair("auf1", "HNRNPD-DT", 0),
+                GenePair("HNRNPD", "HNRNPD-DT", 0),
+            ],
+        )
+        self.assertEqual(missing, ["fdsjkl", "xq1"])
+
+        self.assertRaises(ValueError, proximity_join, ["PTEN"], ["PTEN"], -1)
+        self.assertRaises(
+            WrongGeneName, proximity_join, ["PTEN"], ["xq1"], 0, "raise"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
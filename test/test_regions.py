@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Tests the region queries for correctness.
+
+"""
+import random
+import unittest
+
+from src.hgfind.hgfind import GENE_INDEX
+from src.hgfind.regions import (
+    IntervalIndex,
+    genes_on,
+    hgfind_region,
+    iter_genes,
+    overlapping_rows,
+    parse_region,
+)
+from src.hgfind.table import GeneTable
+
+
+def brute_force(table, chr_code, start, end):
+    """
+    Finds the rows overlapping a region by scanning every row
+
+    """
+    return [
+        row
+        for row in table.rows_on(chr_code)
+        if table.start[row] <= end and table.end[row] >= start
+    ]
+
+
+class TestRegions(unittest.TestCase):
+    """
+    Tests to ensure that region queries find exactly the overlapping genes
+
+    """
+
+    def test_parse_region(self):
+        """
+        Checks that the supported region notations are parsed
+
+        """
+
+        self.assertEqual(
+            parse_region("4:82352498-82374503"), (4, 82352498, 82374503)
+        )
+        self.assertEqual(parse_region("chrX:1,000-2,000"), ("X", 1000, 2000))
+        self.assertEqual(parse_region("MT:5"), ("M", 5, 5))
+        for region in ("gsjfg", "4:", "23:1-2", "4:20-10", "HNRNPD"):
+            self.assertRaises(ValueError, parse_region, region)
+
+    def test_hgfind_region(self):
+        """
+        Checks that the region printed for a gene contains that gene
+
+        """
+
+        results = hgfind_region("4:82352498-82374503")
+        self.assertIn("HNRNPD", [r["official_name"] for r in results])
+        for result in results:
+            self.assertEqual(result["chr_n"], 4)
+            self.assertLessEqual(result["start_coord"], 82374503)
+            self.assertGreaterEqual(result["end_coord"], 82352498)
+
+    def test_matches_brute_force(self):
+        """
+        Checks random queries on the real gene table against a linear scan
+
+        """
+
+        rng = random.Random(0)
+        table = GENE_INDEX.table
+        for _ in range(500):
+            chr_code = rng.choice(list(table.chrom_rows))
+            start = rng.randint(1, 250000000)
+            end = start + rng.choice([0, 1000, 100000, 10000000])
+            self.assertEqual(
+                overlapping_rows(chr_code, start, end),
+                brute_force(table, chr_code, start, end),
+            )
+
+    def test_small_trees(self):
+        """
+        Checks trees of every small size, where the implicit tree is least
+        balanced
+
+        """
+
+        rng = random.Random(0)
+        for n in range(40):
+            coords = {}
+            for i in range(n):
+                start = rng.randint(1, 100)
+                end = start + rng.randint(0, 30)
+                coords[f"G{i}"] = (1, start, end, "+")
+            table = GeneTable(coords)
+            index = IntervalIndex(table, table.rows_on(1))
+            for _ in range(50):
+                start = rng.randint(1, 140)
+                end = start + rng.randint(0, 20)
+                self.assertEqual(
+                    index.overlapping(start, end),
+                    brute_force(table, 1, start, end),
+                )
+
+    def test_subtree_max_end(self):
+        """
+        Checks that every node holds the largest end in its subtree, also
+        when the last subtree is incomplete and holds the longest gene
+
+        """
+
+        for n in range(1, 700, 3):
+            coords = {f"G{i}": (1, i + 1, i + 10, "+") for i in range(n)}
+            coords[f"G{n - 1}"] = (1, n, n + 1000, "+")
+            table = GeneTable(coords)
+            index = IntervalIndex(table, table.rows_on(1))
+            for level in range(1, index.root_level + 1):
+                x = 1 << (level - 1)
+                for i in range((x << 1) - 1, n, x << 2):
+                    subtree = index.end[i - (x << 1) + 1 : i + (x << 1)]
+                    self.assertEqual(index.max_end[i], max(subtree))
+
+    def test_iter_genes(self):
+        """
+        Checks that every official gene is listed once, in genome order
+
+        """
+
+        genes = list(iter_genes())
+        self.assertEqual(len(genes), len(GENE_INDEX.official_to_coord))
+        keys = [(gene["chr_n"], gene["start_coord"]) for gene in genes]
+        self.assertEqual(keys, sorted(keys))
+
+    def test_genes_on(self):
+        """
+        Checks that tiles of a chromosome split its genes by start coordinate
+
+        """
+
+        genes = genes_on("21")
+        self.assertTrue(genes)
+        self.assertTrue(all(gene["chr_n"] == 21 for gene in genes))
+        self.assertEqual(genes, genes_on(21, None, None))
+
+        tile = 5000000
+        starts = range(1, genes[-1]["start_coord"] + 1, tile)
+        tiles = [genes_on(21, start, start + tile - 1) for start in starts]
+        self.assertEqual(sum(tiles, []), genes)
+        for start, tile_genes in zip(starts, tiles):
+            for gene in tile_genes:
+                self.assertGreaterEqual(gene["start_coord"], start)
+                self.assertLess(gene["start_coord"], start + tile)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Tests searches over the names of the genes for correctness.
+
+"""
+import fnmatch
+import re
+import unittest
+
+from src.hgfind.hgfind import GENE_INDEX, hgfind
+from src.hgfind.search import (
+    NameKeys,
+    _glob_literals,
+    _regex_literals,
+    hgfind_complete,
+    hgfind_search,
+)
+
+
+class TestNameKeys(unittest.TestCase):
+    """
+    Tests to ensure that prefixes pick out the right range of names
+
+    """
+
+    def test_prefix_range(self):
+        """
+        Checks that exactly the keys starting with a prefix are found
+
+        """
+
+        name_keys = NameKeys(
+            [("TP53", 0), ("tp53bp1", 1), ("TP5", 2), ("TP6", 3), ("A", 4)]
+        )
+        self.assertEqual(
+            name_keys.keys, ["A", "TP5", "TP53", "TP53BP1", "TP6"]
+        )
+        self.assertEqual(name_keys.names[3], "tp53bp1")
+
+        def names(prefix):
+            return [name_keys.keys[i] for i in name_keys.prefix_range(prefix)]
+
+        self.assertEqual(names("TP5"), ["TP5", "TP53", "TP53BP1"])
+        self.assertEqual(names("TP53B"), ["TP53BP1"])
+        self.assertEqual(names("TP7"), [])
+        self.assertEqual(len(names("")), 5)
+
+    def test_containing(self):
+        """
+        Checks that every key containing a substring is found once
+
+        """
+
+        name_keys = NameKeys([("ABC", 0), ("XABCAB", 1), ("Q", 2), ("ZAB", 3)])
+        self.assertEqual(name_keys.containing("AB"), [0, 2, 3])
+        self.assertEqual(name_keys.containing("Q"), [1])
+        self.assertEqual(name_keys.containing("CX"), [])
+        self.assertEqual(name_keys.containing("C\nQ"), [])
+        self.assertEqual(name_keys.containing(""), [0, 1, 2, 3])
+
+
+class TestComplete(unittest.TestCase):
+    """
+    Tests to ensure that prefixes are completed to the right genes
+
+    """
+
+    def test_official_names_first(self):
+        """
+        Checks that official names are completed in alphabetical order,
+        ahead of synonyms
+
+        """
+
+        results = hgfind_complete("tp5", k=3)
+        self.assertEqual(
+            [result["official_name"] for result in results],
+            ["TP53", "TP53AIP1", "TP53BP1"],
+        )
+        self.assertEqual(results[0], dict(hgfind("TP53"), name="TP53"))
+
+        for result in hgfind_complete("HNRNP", k=50):
+            self.assertTrue(result["name"].upper().startswith("HNRNP"))
+
+    def test_synonyms(self):
+        """
+        Checks that genes are completed by their synonyms, once each
+
+        """
+
+        results = hgfind_complete("auf1")
+        self.assertEqual(results[0]["official_name"], "HNRNPD")
+        self.assertEqual(results[0]["name"], "AUF1")
+
+        officials = [result["official_name"] for result in hgfind_complete("")]
+        self.assertEqual(len(officials), 10)
+        self.assertEqual(len(set(officials)), 10)
+
+    def test_limits(self):
+        """
+        Checks that at most k genes are returned, and none without a match
+
+        """
+
+        self.assertEqual(len(hgfind_complete("A", k=25)), 25)
+        self.assertEqual(hgfind_complete("A", k=0), [])
+        self.assertEqual(hgfind_complete("gsjfgzz"), [])
+        # Every gene completes the empty prefix
+        n_genes = len(GENE_INDEX.table)
+        self.assertEqual(len(hgfind_complete("", k=n_genes + 1)), n_genes)
+
+
+class TestSearch(unittest.TestCase):
+    """
+    Tests to ensure that glob and regular expression searches find every
+    matching gene
+
+    """
+
+    def test_literals(self):
+        """
+        Checks that only literals every match contains are required
+
+        """
+
+        self.assertEqual(_glob_literals("HNRNP*"), ("HNRNP", ["HNRNP"]))
+        self.assertEqual(_glob_literals("*ORF4?"), ("", ["ORF4"]))
+        self.assertEqual(_glob_literals("[AB]C*D"), ("", ["D"]))
+        self.assertEqual(
+            _regex_literals("^SLC2[0-9]A"), ("SLC2", ["SLC2", "A"])
+        )
+        self.assertEqual(_regex_literals("A?BC*D"), ("", ["B", "D"]))
+        self.assertEqual(_regex_literals("X{2}YZ"), ("", ["YZ"]))
+        self.assertEqual(_regex_literals("AB(CD)?EF"), ("", ["AB"]))
+        self.assertEqual(_regex_literals("^A|B"), ("", []))
+        self.assertEqual(_regex_literals("^[^]A]BC"), ("", ["BC"]))
+        self.assertEqual(_regex_literals("X[a\\]b]C"), ("", ["X", "C"]))
+        self.assertEqual(_regex_literals("^C1\\.2*"), ("C1.", ["C1."]))
+        self.assertEqual(_regex_literals("\\x41\\d+BC"), ("", ["BC"]))
+        self.assertEqual(_regex_literals("(?x)A B"), ("", []))
+
+    def test_matches_brute_force(self):
+        """
+        Checks that searches agree with matching every official name
+
+        """
+
+        names = GENE_INDEX.table.names
+
+        def official_names(results):
+            return sorted(result["official_name"] for result in results)
+
+        for pattern in ["hnrnp*", "*orf4?", "C1[5-7]ORF*", "TP53"]:
+            self.assertEqual(
+                official_names(hgfind_search(pattern)),
+                sorted(
+                    name
+                    for name in names
+                    if fnmatch.fnmatchcase(name.upper(), pattern.upper())
+                ),
+            )
+
+        for pattern in ["^SLC2[0-9]A1$", "kin", "^HOX[A-D]\\d+$", "A{3}"]:
+            self.assertEqual(
+                official_names(hgfind_search(pattern, regex=True)),
+                sorted(
+                    name for name in names if re.search(pattern, name, re.I)
+                ),
+            )
+
+    def test_regex_matches_brute_force(self):
+        """
+        Checks that regular expressions with sets, escapes and quantifiers
+        find the same names as searching every official name
+
+        """
+
+        names = GENE_INDEX.table.names
+        for pattern in [
+            "^[^]A]BC",
+            "X[a\\]b]C",
+            "[]A-C]ORF\\d",
+            "^HNRNP[^A-C]",
+            "^C\\d+ORF\\d+$",
+            "\\x41\\x42C",
+            "\\101BC",
+            "\\bTP53\\b",
+            "-AS\\d$",
+            "^MIR\\d+[A-Z]?-?\\d*$",
+            "T{0}P53",
+            "^[A-Z]{2}\\d{1}$",
+            "KRT\\d+?A",
+            "^H[1-4]-?\\.?",
+            "A\\.B*",
+        ]:
+            found = hgfind_search(pattern, regex=True)
+            self.assertEqual(
+                sorted(result["official_name"] for result in found),
+                sorted(
+                    name for name in names if re.search(pattern, name, re.I)
+                ),
+                pattern,
+            )
+
+    def test_results(self):
+        """
+        Checks that genes are described as by hgfind, once each, in genome
+        order, and found by their synonyms on request
+
+        """
+
+        results = hgfind_search("HNRNP*")
+        self.assertIn(dict(hgfind("HNRNPC"), name="HNRNPC"), results)
+        rows = [GENE_INDEX.table.row_of[r["official_name"]] for r in results]
+        self.assertEqual(rows, sorted(set(rows)))
+
+        self.assertEqual(hgfind_search("AUF1"), [])
+        results = hgfind_search("AUF1", synonyms=True)
+        self.assertEqual(results, [dict(hgfind("HNRNPD"), name="AUF1")])
+
+
+if __name__ == "__main__":
+    unittest.main()
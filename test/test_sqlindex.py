@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests the SQLite index backend for correctness.
+
+"""
+import contextlib
+import importlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.hgfind.cache import CACHE_DIR_ENV
+from src.hgfind.hgfind import GENE_INDEX
+from src.hgfind.sqlindex import SqliteIndex, load_sqlite_index, write_database
+
+cache_module = importlib.import_module("src.hgfind.cache")
+
+
+class TestSqliteIndex(unittest.TestCase):
+    """
+    Tests to ensure that the SQLite index answers like the resident index
+
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.path = Path(cls.tmp_dir.name) / "genes.sqlite"
+        write_database(
+            cls.path, GENE_INDEX.name_to_official, GENE_INDEX.official_to_coord
+        )
+        cls.index = SqliteIndex(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.index.close()
+        cls.tmp_dir.cleanup()
+
+    def test_lookup_matches_resident_index(self):
+        """
+        Checks that official names and synonyms resolve identically
+
+        """
+
+        for gene in ("HNRNPC", "AUF1", "NEAT2", "PTEN"):
+            self.assertEqual(self.index.lookup(gene), GENE_INDEX.lookup(gene))
+
+    def test_resolves_like_resident_index(self):
+        """
+        Checks that names in any case, hyphenated, with spaces or with Greek
+        letters resolve as they do through hgfind()
+
+        """
+
+        names = list(GENE_INDEX.name_to_official)[::10]
+        variants = [name.lower() for name in names]
+        variants += [f" {name[:2]}-{name[2:]} " for name in names[::10]]
+        variants += ["il-1 beta", "il1β", "TNF-alpha", "p53", "HNRNP-C"]
+        for gene in variants:
+            self.assertEqual(self.index.lookup(gene), GENE_INDEX.lookup(gene))
+
+    def test_lookup_from_other_threads(self):
+        """
+        Checks that an index opened in one thread answers in others
+
+        """
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.index.lookup("auf1"))
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [self.index.lookup("AUF1")] * 4)
+
+    def test_unknown_name(self):
+        """
+        Checks that unknown names are not found
+
+        """
+
+        self.assertIsNone(self.index.lookup("GSJFG"))
+        self.assertNotIn("4:45-243", self.index)
+
+    def test_without_name_filter(self):
+        """
+        Checks that an index written without a name filter answers the same
+
+        """
+
+        path = Path(self.tmp_dir.name) / "unfiltered.sqlite"
+        write_database(
+            path,
+            GENE_INDEX.name_to_official,
+            GENE_INDEX.official_to_coord,
+            filter_bits_per_key=0,
+        )
+        with SqliteIndex(path) as index:
+            self.assertEqual(index.lookup("AUF1"), self.index.lookup("AUF1"))
+            self.assertIsNone(index.lookup("GSJFG"))
+
+    def test_rejects_foreign_file(self):
+        """
+        Checks that files that are not SQLite indexes are rejected
+
+        """
+
+        path = Path(self.tmp_dir.name) / "not-an-index"
+        path.write_bytes(b"Gene start (bp)\tGene end (bp)\n")
+        self.assertRaises(ValueError, SqliteIndex, path)
+
+    def test_unwritable_cache_dir(self):
+        """
+        Checks that the index is built in a temporary file when the cache
+        directory cannot be written
+
+        """
+
+        unwritable = Path(self.tmp_dir.name) / "file"
+        unwritable.write_bytes(b"")
+        stderr = io.StringIO()
+        with mock.patch.dict(
+            os.environ, {CACHE_DIR_ENV: str(unwritable / "cache")}
+        ), mock.patch.object(
+            cache_module, "PREBUILT_DIR", Path(self.tmp_dir.name)
+        ), contextlib.redirect_stderr(
+            stderr
+        ):
+            with load_sqlite_index() as index:
+                self.assertEqual(
+                    index.lookup("auf1"), self.index.lookup("AUF1")
+                )
+        self.assertIn("Could not cache", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests the genome ordered gene table for correctness.
+
+"""
+import unittest
+
+from src.hgfind.hgfind import GENE_INDEX
+from src.hgfind.table import CODE_TO_STRAND
+
+
+class TestGeneTable(unittest.TestCase):
+    """
+    Tests to ensure that the gene table mirrors the lookup dictionaries
+
+    """
+
+    def test_rows_match_dictionaries(self):
+        """
+        Checks that every official gene has a row holding its location
+
+        """
+
+        table = GENE_INDEX.table
+        self.assertEqual(len(table), len(GENE_INDEX.official_to_coord))
+        for official_name in ("HNRNPC", "HNRNPD", "MALAT1"):
+            row = table.row_of[official_name]
+            chr_n, start, end, strand = GENE_INDEX.official_to_coord[
+                official_name
+            ]
+            self.assertEqual(table.names[row], official_name)
+            self.assertEqual(table.chrom[row], int(chr_n))
+            self.assertEqual(table.start[row], start)
+            self.assertEqual(table.end[row], end)
+            self.assertEqual(CODE_TO_STRAND[table.strand[row]], strand)
+
+    def test_genome_order(self):
+        """
+        Checks that rows are sorted by chromosome and start coordinate and
+        grouped per chromosome
+
+        """
+
+        table = GENE_INDEX.table
+        keys = list(zip(table.chrom, table.start))
+        self.assertEqual(keys, sorted(keys))
+        for code, (first, last) in table.chrom_rows.items():
+            self.assertTrue(all(c == code for c in table.chrom[first:last]))
+        self.assertEqual(
+            sum(len(table.rows_on(code)) for code in table.chrom_rows),
+            len(table),
+        )
+
+    def test_derived_table_is_shared(self):
+        """
+        Checks that the table is built once per loaded index
+
+        """
+
+        self.assertIs(GENE_INDEX.table, GENE_INDEX.table)
+
+
+if __name__ == "__main__":
+    unittest.main()
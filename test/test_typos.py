@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests the suggestions of gene names for correctness.
+
+"""
+import unittest
+
+from src.hgfind.typos import NameSuggester, edit_distance
+
+
+class TestEditDistance(unittest.TestCase):
+    """
+    Tests to ensure that edit distances are computed correctly
+
+    """
+
+    def test_distances(self):
+        """
+        Checks distances within and beyond the largest distance of interest
+
+        """
+
+        self.assertEqual(edit_distance("PTEN", "PTEN", 2), 0)
+        self.assertEqual(edit_distance("PTEN", "PTN", 2), 1)
+        self.assertEqual(edit_distance("TP53", "TP35", 2), 2)
+        self.assertEqual(edit_distance("", "AB", 2), 2)
+        self.assertIsNone(edit_distance("TP53", "TP35", 1))
+        self.assertIsNone(edit_distance("HNRNPC", "MALAT1", 2))
+
+
+class TestNameSuggester(unittest.TestCase):
+    """
+    Tests to ensure that the closest names are suggested
+
+    """
+
+    def setUp(self):
+        self.suggester = NameSuggester(
+            ["HNRNPC", "hnRNPD", "HNRNPCL1", "MALAT1", "PTEN", "PTN", "TP53"]
+        )
+
+    def test_nearest_first(self):
+        """
+        Checks that names are suggested nearest first, as listed
+
+        """
+
+        self.assertEqual(
+            self.suggester.suggest("hnrnpcd"), ["HNRNPC", "hnRNPD", "HNRNPCL1"]
+        )
+        self.assertEqual(self.suggester.suggest("PTEM"), ["PTEN", "PTN"])
+        self.assertEqual(self.suggester.suggest("PTEM", limit=1), ["PTEN"])
+
+    def test_no_suggestions(self):
+        """
+        Checks that known, distant and too short names get no suggestions
+
+        """
+
+        self.assertEqual(self.suggester.suggest("PTEN", max_distance=0), [])
+        self.assertEqual(self.suggester.suggest("GSJFG"), [])
+        self.assertEqual(self.suggester.suggest("P"), [])
+        self.assertEqual(self.suggester.suggest(""), [])
+
+    def test_budget(self):
+        """
+        Checks that names are still suggested without any time to spare
+
+        """
+
+        self.assertEqual(self.suggester.suggest("MALAT", budget=0), ["MALAT1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests the strand-aware gene windows for correctness.
+
+"""
+import random
+import unittest
+
+from src.hgfind.hgfind import CHROMOSOME_LENGTHS, GENE_INDEX, hgfind
+from src.hgfind.windows import gene_windows, windows_bed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def expected_window(gene, upstream, downstream, anchor):
+    """
+    Computes the window around one gene from its hgfind() location
+
+    """
+    result = hgfind(gene)
+    start, end = result["start_coord"], result["end_coord"]
+    reverse = result["strand"] == "-"
+    if anchor == "tss":
+        start = end = end if reverse else start
+    elif anchor == "tes":
+        start = end = start if reverse else end
+    if reverse:
+        upstream, downstream = downstream, upstream
+    length = CHROMOSOME_LENGTHS[int(result["chr_n"])]
+    return max(start - upstream, 1), min(end + downstream, length)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestGeneWindows(unittest.TestCase):
+    """
+    Tests to ensure that the batched windows match a gene by gene computation
+
+    """
+
+    def test_matches_single_genes(self):
+        """
+        Checks random genes for every anchor against their hgfind() location
+
+        """
+
+        rng = random.Random(19)
+        names = [
+            name for name in GENE_INDEX.official_to_coord if name.isupper()
+        ]
+        genes = rng.sample(names, 200) + ["MT-ND1", "MT-TF", "auf1"]
+        for anchor in ("tss", "tes", "gene"):
+            windows = gene_windows(genes, 5000, 1000, anchor)
+            for i, gene in enumerate(genes):
+                self.assertEqual(
+                    (windows.start[i], windows.end[i]),
+                    expected_window(gene, 5000, 1000, anchor),
+                )
+
+    def test_all_genes_and_missing(self):
+        """
+        Checks the windows of every gene and of unrecognized names
+
+        """
+
+        windows = gene_windows()
+        self.assertEqual(len(windows.start), len(GENE_INDEX.table))
+        self.assertTrue(windows.found.all())
+        self.assertTrue((windows.start >= 1).all())
+        self.assertTrue((windows.start <= windows.end).all())
+
+        windows = gene_windows(["gewgwre"])
+        self.assertEqual((windows.start[0], windows.end[0]), (-1, -1))
+        self.assertRaises(ValueError, gene_windows, ["PTEN"], anchor="cds")
+        self.assertRaises(ValueError, gene_windows, ["PTEN"], -1)
+
+    def test_bed(self):
+        """
+        Checks the BED formatting of windows
+
+        """
+
+        windows = gene_windows(["PTEN", "gewgwre", "auf1"], 2000, 500)
+        self.assertEqual(
+            list(windows_bed(windows)),
+            [
+                "chr10\t87861624\t87864125\tPTEN\t0\t+",
+                "chr4\t82374002\t82376503\tHNRNPD\t0\t-",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()